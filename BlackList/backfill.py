@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import deque
+from telethon.errors import FloodWaitError
+
+# Message IDs per range. Small enough to balance work between workers,
+# large enough that each range is only a handful of GetHistory pages.
+DEFAULT_RANGE_SIZE = 2000
+
+
+class FloodGate:
+    """
+    Shared pause for all backfill workers.
+    When one worker hits FloodWait, every worker waits it out before the next request.
+    """
+    def __init__(self):
+        self.resume_at = 0.0
+
+    def block(self, seconds):
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    async def wait(self):
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def split_ranges(min_id, max_id, range_size=DEFAULT_RANGE_SIZE):
+    """
+    Splits the ID space (min_id, max_id] into contiguous (lo, hi] ranges, oldest first.
+    """
+    ranges = []
+    lo = min_id
+    while lo < max_id:
+        hi = min(lo + range_size, max_id)
+        ranges.append((lo, hi))
+        lo = hi
+    return ranges
+
+
+async def get_latest_id(client, target):
+    latest = await client.get_messages(target, limit=1)
+    if latest:
+        return latest[0].id
+    return 0
+
+
+async def fetch_range(client, target, lo, hi, gate, semaphore):
+    """
+    Fetches all messages with lo < id <= hi (Oldest -> Newest).
+    Resumes from the last fetched ID after a FloodWait instead of starting over.
+    """
+    messages = []
+    cursor = lo
+
+    async with semaphore:
+        while True:
+            await gate.wait()
+            try:
+                # min_id / max_id are exclusive in Telethon
+                async for message in client.iter_messages(target, reverse=True, min_id=cursor, max_id=hi + 1):
+                    messages.append(message)
+                    cursor = message.id
+                return messages
+            except FloodWaitError as e:
+                print(f"FloodWait on range ({lo}, {hi}]: sleeping {e.seconds}s (resume from ID {cursor})")
+                gate.block(e.seconds)
+
+
+async def iter_backfill(client, target, min_id, max_id, workers=4, range_size=DEFAULT_RANGE_SIZE):
+    """
+    Fetches (min_id, max_id] with up to `workers` concurrent ranges.
+    Yields (range_hi, messages) in ID order so the caller can checkpoint range_hi
+    once the messages are processed. At most 2 * workers ranges are held in memory.
+    """
+    ranges = split_ranges(min_id, max_id, range_size)
+    if not ranges:
+        return
+
+    print(f"Backfill: {len(ranges)} ranges of up to {range_size} IDs, {workers} workers.")
+
+    gate = FloodGate()
+    semaphore = asyncio.Semaphore(workers)
+    window = deque()
+    pending = iter(ranges)
+
+    def schedule_next():
+        r = next(pending, None)
+        if r is None:
+            return False
+        lo, hi = r
+        task = asyncio.ensure_future(fetch_range(client, target, lo, hi, gate, semaphore))
+        window.append((hi, task))
+        return True
+
+    for _ in range(workers * 2):
+        if not schedule_next():
+            break
+
+    try:
+        while window:
+            hi, task = window.popleft()
+            messages = await task
+            schedule_next()
+            yield hi, messages
+    finally:
+        for _, task in window:
+            task.cancel()
@@ -1,11 +1,45 @@
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+# Shared modules (common/) live at the project root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
 API_ID = int(os.getenv("API_ID", 0))
 API_HASH = os.getenv("API_HASH")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 TARGET_URL = os.getenv("BLACKLIST_TARGET_URL")
 SOURCE_CHAT_ID = os.getenv("BLACKLIST_SOURCE_CHAT_ID") # Can be username or ID
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+
+# Adaptive scheduler (--schedule), seconds
+SCHEDULE_MIN_INTERVAL = int(os.getenv("SCHEDULE_MIN_INTERVAL", 300))
+SCHEDULE_MAX_INTERVAL = int(os.getenv("SCHEDULE_MAX_INTERVAL", 3 * 3600))
+SCHEDULE_TARGET_PER_POLL = float(os.getenv("SCHEDULE_TARGET_PER_POLL", 5))
+SCHEDULE_JITTER = float(os.getenv("SCHEDULE_JITTER", 0.2))
+
+# Media policy: only fetch what post_blacklist can upload
+MEDIA_ALLOWED_MIME_TYPES = os.getenv("MEDIA_ALLOWED_MIME_TYPES", "image/jpeg,image/png").split(",")
+MEDIA_TARGET_RESOLUTION = int(os.getenv("MEDIA_TARGET_RESOLUTION", 1280)) # px, longest side
+MEDIA_MAX_BYTES_PER_INCIDENT = int(os.getenv("MEDIA_MAX_BYTES_PER_INCIDENT", 20 * 1024 * 1024))
+
+# Image normalization before upload
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 1600)) # px, longest side
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 82))
+NORMALIZED_CACHE_MAX_BYTES = int(os.getenv("NORMALIZED_CACHE_MAX_BYTES", 256 * 1024 * 1024)) # image_cache/normalized
+
+# dool.co.kr API client
+DOOL_POOL_SIZE = int(os.getenv("DOOL_POOL_SIZE", 10))
+DOOL_CONNECT_TIMEOUT = float(os.getenv("DOOL_CONNECT_TIMEOUT", 5))
+DOOL_READ_TIMEOUT = float(os.getenv("DOOL_READ_TIMEOUT", 60))
+DOOL_MAX_RETRIES = int(os.getenv("DOOL_MAX_RETRIES", 3))
+
+# HTTP transport: "requests" (blocking, default) or "httpx" (async, HTTP/2)
+HTTP_TRANSPORT = os.getenv("HTTP_TRANSPORT", "requests").lower()
+
+# Selenium fallback poster: run Chrome headless (the profile must already be logged in)
+SELENIUM_HEADLESS = os.getenv("SELENIUM_HEADLESS", "0") == "1"
+# Parallel Selenium posting: headless drivers in WebPosterPool (each with a cloned profile)
+SELENIUM_POOL_SIZE = int(os.getenv("SELENIUM_POOL_SIZE", "3"))
@@ -4,6 +4,12 @@ from telethon import TelegramClient, events
 import config
 from web_poster_api import WebPosterAPI
 from ai_optimizer import AIOptimizer
+from backfill import iter_backfill, get_latest_id
+from media_download import download_media_parallel, print_download_summary
+from media_policy import select_media
+from common.scheduler import AdaptiveScheduler, run_scheduled
+from common.runtime import RunBudget, InstanceLock
+from common.dool_client import CircuitOpenError
 from db import init_db, is_posted, save_posted, save_pending, get_pending_items, mark_item_posted
 import re
 import argparse
@@ -83,18 +89,29 @@ async def process_message(message):
     full_text = ""
     image_paths = []
     seen_hashes = set()
+    media_bytes = 0
     
     for m in group_messages:
         # Text
         if m.text:
             full_text += m.text + "\n"
         
-        # Media
+        # Media (only what the poster can upload, within the per-incident byte budget)
         if m.media:
+            choice = select_media(m)
+            if choice is None:
+                print(f"Skipping unsupported media for {m.id} ({type(m.media).__name__}).")
+                continue
+            thumb, size = choice
+            if media_bytes + size > config.MEDIA_MAX_BYTES_PER_INCIDENT:
+                print(f"Skipping media for {m.id}: per-incident budget of {config.MEDIA_MAX_BYTES_PER_INCIDENT} bytes reached.")
+                continue
+            
             try:
                 # Use unique filename per message
-                path = await m.download_media(file=os.path.join("images", f"{chat_id}_{m.id}"))
+                path = await download_media_parallel(client, m, os.path.join("images", f"{chat_id}_{m.id}"), thumb=thumb)
                 if path:
+                    media_bytes += size # Charged only for media actually downloaded
                     # Deduplication Check
                     file_hash = calculate_file_hash(path)
                     if file_hash in seen_hashes:
@@ -137,6 +154,10 @@ async def process_message(message):
 
 # State file mapping: Source Chat -> Last ID/Offset
 LAST_ID_FILE = "last_msg_id.txt"
+SCHEDULE_STATE_FILE = "schedule_state.json"
+LOCK_FILE = "crawler.lock"
+
+instance_lock = InstanceLock(LOCK_FILE)
 
 def load_last_id():
     if os.path.exists(LAST_ID_FILE):
@@ -151,9 +172,10 @@ def save_last_id(last_id):
     with open(LAST_ID_FILE, "w") as f:
         f.write(str(last_id))
 
-async def start_history_fetch():
+async def start_history_fetch(budget=None):
     target = config.SOURCE_CHAT_ID
     last_id = load_last_id()
+    budget = budget or RunBudget()
     
     print(f"Fetching history from {target} (Reverse Order: Oldest -> Newest)...")
     print(f"Resuming from Message ID: {last_id}")
@@ -164,13 +186,18 @@ async def start_history_fetch():
     try:
         # Use min_id to skip old messages
         async for message in client.iter_messages(target, reverse=True, min_id=last_id):
-           if message.id > max_id_seen:
-               max_id_seen = message.id
+           if budget.expired():
+               print("Time budget exhausted. Stopping collection.")
+               break
                
            if message.text or message.media:
                await process_message(message)
                count += 1
                
+           # Only advance past messages that were fully processed
+           if message.id > max_id_seen:
+               max_id_seen = message.id
+               
         # Save the new max ID after successful fetch
         if max_id_seen > last_id:
             save_last_id(max_id_seen)
@@ -180,8 +207,55 @@ async def start_history_fetch():
         print(f"Error fetching history: {e}")
     
     print(f"History fetch complete. Processed/Checked {count} messages.")
+    return count
 
-async def interactive_review(auto_confirm=False):
+async def start_backfill_fetch(workers=4, budget=None):
+    """
+    Parallel variant of start_history_fetch for first-time syncs.
+    Splits [last_id, latest_id] into ID ranges fetched concurrently,
+    then processes them in order and checkpoints after each range.
+    """
+    target = config.SOURCE_CHAT_ID
+    last_id = load_last_id()
+    budget = budget or RunBudget()
+    
+    count = 0
+    ranges = None
+    
+    try:
+        latest_id = await get_latest_id(client, target)
+        print(f"Backfilling {target}: IDs {last_id} -> {latest_id} ({workers} workers)...")
+        
+        ranges = iter_backfill(client, target, last_id, latest_id, workers=workers)
+        async for range_hi, messages in ranges:
+            for message in messages:
+                if budget.expired():
+                    break
+                if message.text or message.media:
+                    await process_message(message)
+                    count += 1
+                last_id = message.id
+            else:
+                # Every ID up to range_hi has been processed
+                last_id = range_hi
+                
+            save_last_id(last_id)
+            print(f"Updated checkpoint to ID: {last_id}")
+            
+            if budget.expired():
+                print("Time budget exhausted. Stopping backfill.")
+                break
+            
+    except Exception as e:
+        print(f"Error during backfill: {e}")
+    finally:
+        if ranges is not None:
+            await ranges.aclose() # Cancel in-flight range fetches
+    
+    print(f"Backfill complete. Processed/Checked {count} messages.")
+    return count
+
+async def interactive_review(auto_confirm=False, budget=None):
     print("\n" + "="*40)
     print("      REVIEW AND POSTING PHASE")
     print("="*40)
@@ -216,19 +290,27 @@ async def interactive_review(auto_confirm=False):
         print("Login failed. Aborting upload.")
         return
 
+    budget = budget or RunBudget()
     success_count = 0
     fail_count = 0
     
     for item in pending_items:
+        if budget.expired():
+            print("Time budget exhausted. Remaining items stay in Pending state.")
+            break
+            
         ai_data = item['ai_data']
         # Pass the incident date from DB to AI data so poster can use it
         ai_data['incident_date'] = item.get('incident_date')
         
         print(f"Posting: {ai_data.get('title')} (Original Date: {ai_data['incident_date']})...")
         
-        # Use ThreadPoolExecutor for blocking Selenium (or loop.run_in_executor)
-        loop = asyncio.get_event_loop()
-        success = await loop.run_in_executor(None, poster.post_blacklist, ai_data, False)
+        # Native async upload with HTTP_TRANSPORT=httpx, otherwise the blocking poster in a thread
+        try:
+            success = await poster.post_blacklist_async(ai_data, False)
+        except CircuitOpenError as e:
+            print(f"dool.co.kr looks down ({e}). Stopping upload; remaining items stay in Pending state.")
+            break
         
         if success:
             print(" -> Success!")
@@ -250,11 +332,41 @@ async def interactive_review(auto_confirm=False):
             
     print(f"\nBatch processing complete. Success: {success_count}, Failed: {fail_count}")
 
+async def run_once(backfill=False, auto_confirm=False, workers=4, time_budget=None):
+    """
+    One collection + posting cycle. Returns the number of messages collected.
+    All phases share one time budget (seconds, None = unlimited).
+    """
+    budget = RunBudget(time_budget)
+    
+    # 1. Collection Phase
+    print("\n[Phase 1] Collecting Data...")
+    if backfill:
+        count = await start_backfill_fetch(workers=workers, budget=budget)
+    else:
+        count = await start_history_fetch(budget=budget)
+    print_download_summary()
+    
+    # 2. Review & Post Phase
+    print("\n[Phase 2] Review process...")
+    await interactive_review(auto_confirm=auto_confirm, budget=budget)
+    
+    return count
+
 async def main():
     parser = argparse.ArgumentParser(description="BlackList Crawler & Poster")
     parser.add_argument('-y', '--yes', action='store_true', help="Auto-confirm registration (non-interactive mode)")
+    parser.add_argument('--backfill', action='store_true', help="Fetch history with parallel ID ranges (first-time sync)")
+    parser.add_argument('--backfill-workers', type=int, default=4, help="Concurrent ranges for --backfill (default: 4)")
+    parser.add_argument('--schedule', action='store_true', help="Keep running and poll at an adaptive interval (implies --yes)")
+    parser.add_argument('--time-budget', type=int, default=None, help="Stop starting new work after N seconds per run (e.g. 3300 for hourly cron)")
     args = parser.parse_args()
 
+    # Refuse to run alongside another instance (e.g. a slow cron run)
+    if not instance_lock.acquire():
+        print(f"Another crawler instance holds {LOCK_FILE}. Exiting.")
+        return
+
     print("Starting Crawler (Batch Mode)...")
     
     # 0. Init DB
@@ -264,13 +376,25 @@ async def main():
     print("Starting Telegram Client...")
     await client.start(bot_token=config.TELEGRAM_BOT_TOKEN)
     
-    # 2. Collection Phase
-    print("\n[Phase 1] Collecting Data...")
-    await start_history_fetch()
+    if args.schedule:
+        scheduler = AdaptiveScheduler(
+            SCHEDULE_STATE_FILE,
+            min_interval=config.SCHEDULE_MIN_INTERVAL,
+            max_interval=config.SCHEDULE_MAX_INTERVAL,
+            target_per_poll=config.SCHEDULE_TARGET_PER_POLL,
+            jitter=config.SCHEDULE_JITTER
+        )
+        print("Scheduler mode enabled. Auto-confirm is on.")
+        
+        # Initial backfill is not a normal poll, so it does not feed the rate estimate
+        if args.backfill:
+            await start_backfill_fetch(workers=args.backfill_workers, budget=RunBudget(args.time_budget))
+        
+        await run_scheduled(str(config.SOURCE_CHAT_ID), lambda: run_once(auto_confirm=True, time_budget=args.time_budget), scheduler)
+        return
     
-    # 3. Review & Post Phase
-    print("\n[Phase 2] Review process...")
-    await interactive_review(auto_confirm=args.yes)
+    await run_once(backfill=args.backfill, auto_confirm=args.yes, workers=args.backfill_workers, time_budget=args.time_budget)
+    await poster.aclose()
     
     print("\nAll tasks done. Exiting.")
 
@@ -281,3 +405,4 @@ if __name__ == '__main__':
         print("Stopping...")
     finally:
         poster.close()
+        instance_lock.release()
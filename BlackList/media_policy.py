@@ -0,0 +1,32 @@
+from telethon.tl import types
+import config
+from media_download import photo_size_bytes
+
+def select_media(message):
+    """
+    Decides what to download for message.media before any bytes are fetched.
+    Returns (thumb, size): thumb is the PhotoSize to fetch (None = the whole document),
+    size the expected byte count (0 if unknown).
+    Returns None for media the poster never uploads (videos, stickers, other documents...).
+    """
+    if message.photo and isinstance(message.photo, types.Photo):
+        sizes = [s for s in message.photo.sizes if isinstance(s, (types.PhotoSize, types.PhotoSizeProgressive))]
+        if not sizes:
+            return None
+        
+        # Smallest size that still covers the target resolution, else the largest available
+        large_enough = [s for s in sizes if max(s.w, s.h) >= config.MEDIA_TARGET_RESOLUTION]
+        if large_enough:
+            thumb = min(large_enough, key=photo_size_bytes)
+        else:
+            thumb = max(sizes, key=photo_size_bytes)
+        return thumb, photo_size_bytes(thumb)
+    
+    doc = message.document
+    if doc and isinstance(doc, types.Document):
+        if any(isinstance(a, types.DocumentAttributeSticker) for a in doc.attributes):
+            return None
+        if doc.mime_type in config.MEDIA_ALLOWED_MIME_TYPES:
+            return None, doc.size
+    
+    return None
@@ -1,25 +1,48 @@
-import requests
-import hmac
-import hashlib
+import asyncio
 import json
-import time
 import os
+import time
 import config
-from urllib.parse import unquote
+from common import async_http
+from common.async_http import AsyncDoolClient
+from common.dool_client import DoolClient, CircuitOpenError
+from common.image_prep import ImagePreparer, extension_for
 
 class WebPosterAPI:
     def __init__(self):
         self.base_url = "https://dool.co.kr/api" # Production API URL
-        self.session = requests.Session()
-        self.token = None
+        # Login, token reuse, timeouts, retries and circuit breaker live in the shared client
+        self.client = DoolClient(
+            self.base_url,
+            config.TELEGRAM_BOT_TOKEN,
+            pool_size=config.DOOL_POOL_SIZE,
+            connect_timeout=config.DOOL_CONNECT_TIMEOUT,
+            read_timeout=config.DOOL_READ_TIMEOUT,
+            max_retries=config.DOOL_MAX_RETRIES
+        )
+        self.image_preparer = ImagePreparer(
+            max_dim=config.IMAGE_MAX_DIMENSION, quality=config.IMAGE_JPEG_QUALITY,
+            max_bytes=config.NORMALIZED_CACHE_MAX_BYTES
+        )
         
-        # Headers (Mimic Browser)
-        self.session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Referer": "https://dool.co.kr/",
-            "Origin": "https://dool.co.kr",
-            "Accept": "application/json, text/plain, */*"
-        })
+        # Optional async transport (httpx, HTTP/2) for use from the event loop
+        self.async_client = None
+        if config.HTTP_TRANSPORT == "httpx":
+            if async_http.available():
+                self.async_client = AsyncDoolClient(
+                    self.base_url,
+                    config.TELEGRAM_BOT_TOKEN,
+                    pool_size=config.DOOL_POOL_SIZE,
+                    connect_timeout=config.DOOL_CONNECT_TIMEOUT,
+                    read_timeout=config.DOOL_READ_TIMEOUT,
+                    max_retries=config.DOOL_MAX_RETRIES
+                )
+            else:
+                print("Warning: HTTP_TRANSPORT=httpx but httpx is not installed. Using requests.")
+
+    @property
+    def token(self):
+        return self.client.token
 
     def generate_telegram_auth_data(self):
         """
@@ -54,61 +77,76 @@ class WebPosterAPI:
         # I will expose a method to set user_id.
         pass
 
-    def login(self, user_data=None):
+    def login(self, user_data=None, force=False):
         """
         Logs in via /api/auth/telegram.
         user_data: dict with id, first_name, username, photo_url
         If None, generates a dummy one (Risky if role check exists).
+        Reuses a still-valid token from a previous run unless force=True.
+        """
+        return self.client.login(user_data, force=force)
+
+    def _build_multipart(self, data, opened_files):
+        """
+        Maps crawler data to the API payload and prepares the multipart fields.
+        Opened file handles are appended to opened_files for the caller to close.
         """
-        if not user_data:
-             # Default to a "Crawler Admin" persona
-             user_data = {
-                 "id": 123456789, 
-                 "first_name": "Crawler", 
-                 "username": "crawler_bot", 
-                 "photo_url": "",
-                 "auth_date": int(time.time())
-             }
-        else:
-            user_data["auth_date"] = int(time.time())
-
-        # 1. Create Data-Check-String
-        # sort keys
-        keys = sorted([k for k in user_data.keys() if k != "hash"])
-        data_check_string = "\n".join([f"{k}={user_data[k]}" for k in keys])
+        # Map Crawler Data -> API Payload (BadUserCreateRequest)
+        # Crawler keys: features, damage_content, location_city, location_district
+        # API keys: physicalDescription, reason, region, category, incidentDate
+
+        # Region construction
+        city = data.get('location_city', '')
+        district = data.get('location_district', '')
+        region = f"{city} {district}".strip()
+        if not region: region = "정보없음"
+
+        api_payload = {
+            "category": data.get('category', 'OTHER'),
+            "region": region,
+            "reason": data.get('damage_content', ''),
+            "physicalDescription": data.get('features', ''),
+            "incidentDate": data.get('incident_date', '')
+        }
+
+        # Prepare Multipart Upload
+        # 'data' field is JSON string
+        # 'image_{i}' are files
+        multipart_data = [] # List of tuples for requests files/data
         
-        # 2. Secret Key = SHA256(bot_token)
-        secret_key = hashlib.sha256(config.TELEGRAM_BOT_TOKEN.encode()).digest()
+        # 1. JSON Data
+        multipart_data.append(('data', (None, json.dumps(api_payload), 'application/json')))
         
-        # 3. Hash = HMAC_SHA256(secret_key, data_check_string)
-        hash_value = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        # 2. Images (normalized in a process pool: downscaled, EXIF stripped, real MIME type)
+        image_paths = []
+        for path in data.get('images', []):
+            if os.path.exists(path):
+                image_paths.append(path)
+            else:
+                print(f"Image not found: {path}")
         
-        user_data["hash"] = hash_value
+        prepared = self.image_preparer.prepare(image_paths)
+        original_bytes = sum(os.path.getsize(p) for p in image_paths)
+        upload_bytes = 0
         
-        # 4. Request
-        print(f"Logging in as {user_data.get('username')}...")
-        try:
-            resp = self.session.post(
-                f"{self.base_url}/auth/telegram",
-                data=user_data # requests constructs form-urlencoded automatically for dict
-            )
-            resp.raise_for_status()
-            
-            data = resp.json()
-            self.token = data['token']['accessToken']
+        for i, (src, mime) in enumerate(prepared):
+            if isinstance(src, bytes):
+                fileobj = src
+                upload_bytes += len(src)
+            else:
+                fileobj = open(src, 'rb')
+                opened_files.append(fileobj)
+                upload_bytes += os.path.getsize(src)
             
-            # Set Authorization Header for future requests
-            self.session.headers.update({
-                "Authorization": f"Bearer {self.token}"
-            })
-            print("Login successful! Token acquired.")
-            return True
-            
-        except Exception as e:
-            print(f"Login failed: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Server Response: {e.response.text}")
-            return False
+            # (field_name, (filename, file_object, content_type))
+            filename = os.path.splitext(os.path.basename(image_paths[i]))[0] + extension_for(mime)
+            multipart_data.append((f'image_{i}', (filename, fileobj, mime)))
+            print(f"Attached image {i}: {image_paths[i]} ({mime})")
+        
+        if image_paths:
+            print(f"Images: {original_bytes / 1024:.0f} KB -> {upload_bytes / 1024:.0f} KB after normalization")
+        
+        return multipart_data
 
     def post_blacklist(self, data, dry_run=False):
         """
@@ -131,69 +169,24 @@ class WebPosterAPI:
             print(f"[API Dry Run] Data: {data}")
             return True
 
-        # Map Crawler Data -> API Payload (BadUserCreateRequest)
-        # Crawler keys: features, damage_content, location_city, location_district
-        # API keys: physicalDescription, reason, region, category, incidentDate
-
-        # Region construction
-        city = data.get('location_city', '')
-        district = data.get('location_district', '')
-        region = f"{city} {district}".strip()
-        if not region: region = "정보없음"
-
-        api_payload = {
-            "category": data.get('category', 'OTHER'),
-            "region": region,
-            "reason": data.get('damage_content', ''),
-            "physicalDescription": data.get('features', ''),
-            "incidentDate": data.get('incident_date', '')
-        }
-
-        # Prepare Multipart Upload
-        # 'data' field is JSON string
-        # 'image_{i}' are files
-        
-        files_to_upload = []
         opened_files = [] # Keep references to close later
         
         try:
-            multipart_data = [] # List of tuples for requests files/data
-            
-            # 1. JSON Data
-            multipart_data.append(('data', (None, json.dumps(api_payload), 'application/json')))
-            
-            # 2. Images
-            image_paths = data.get('images', [])
-            for i, path in enumerate(image_paths):
-                if os.path.exists(path):
-                    f = open(path, 'rb')
-                    opened_files.append(f)
-                    # (field_name, (filename, file_object, content_type))
-                    # Content-Type guessing is good practice, but not strictly required if server ignores it
-                    mime = "image/jpeg"
-                    if path.lower().endswith(".png"): mime = "image/png"
-                    
-                    multipart_data.append((f'image_{i}', (os.path.basename(path), f, mime)))
-                    print(f"Attached image {i}: {path}")
-                else:
-                    print(f"Image not found: {path}")
+            multipart_data = self._build_multipart(data, opened_files)
 
             print(f"Sending POST to {self.base_url}/blacklist ...")
             
-            resp = self.session.post(
-                f"{self.base_url}/blacklist",
-                files=multipart_data
-                # Note: 'data' can be passed in files list for multipart/form-data with mixed types
-                # requests handles boundary automatically
-            )
+            resp = self.client.post_multipart("/blacklist", multipart_data)
             
             resp.raise_for_status()
             print("Post success!", resp.json())
             return True
 
+        except CircuitOpenError:
+            raise # Let the caller stop the run
         except Exception as e:
             print(f"Post failed: {e}")
-            if hasattr(e, 'response') and e.response:
+            if getattr(e, 'response', None) is not None:
                 print(f"Response: {e.response.text}")
             return False
             
@@ -202,5 +195,52 @@ class WebPosterAPI:
             for f in opened_files:
                 f.close()
 
+    async def post_blacklist_async(self, data, dry_run=False):
+        """
+        Same as post_blacklist, sent natively from the event loop over the async (HTTP/2)
+        transport when HTTP_TRANSPORT=httpx. Otherwise runs post_blacklist in a thread.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.async_client:
+            return await loop.run_in_executor(None, self.post_blacklist, data, dry_run)
+
+        if not self.async_client.token:
+            if not await self.async_client.login():
+                return False
+
+        if dry_run:
+            print(f"[API Dry Run] Data: {data}")
+            return True
+
+        opened_files = []
+        
+        try:
+            # Image normalization blocks, so it runs off the event loop
+            multipart_data = await loop.run_in_executor(None, self._build_multipart, data, opened_files)
+
+            print(f"Sending POST to {self.base_url}/blacklist (async) ...")
+            
+            resp = await self.async_client.post_multipart("/blacklist", multipart_data)
+            
+            resp.raise_for_status()
+            print("Post success!", resp.json())
+            return True
+
+        except CircuitOpenError:
+            raise # Let the caller stop the run
+        except Exception as e:
+            print(f"Post failed: {e}")
+            if getattr(e, 'response', None) is not None:
+                print(f"Response: {e.response.text}")
+            return False
+            
+        finally:
+            for f in opened_files:
+                f.close()
+
     def close(self):
-        self.session.close()
+        self.client.close()
+
+    async def aclose(self):
+        if self.async_client:
+            await self.async_client.aclose()
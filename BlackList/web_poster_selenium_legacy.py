@@ -1,38 +1,81 @@
-import time
 import os
 import pickle
+import queue
+import shutil
+import threading
+from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 import config
 
 LOGIN_URL = "https://dool.co.kr/login"
+HOME_URL = "https://dool.co.kr/"
 # The user specified this URL for posting
 CREATE_URL = "http://dool.co.kr/blacklist/create" 
 COOKIES_FILE = "cookies.pkl"
+DEFAULT_PROFILE_DIR = "chrome_profile_blacklist"
+POOL_PROFILE_DIR = "chrome_profile_blacklist_pool"
+
+# Not copied into pool profiles: per-instance locks and caches Chrome rebuilds by itself
+PROFILE_COPY_IGNORE = shutil.ignore_patterns(
+    "Singleton*", "*.lock", "lockfile", "Cache", "Code Cache", "GPUCache", "ShaderCache",
+    "GrShaderCache", "Service Worker", "Crashpad", "BrowserMetrics*"
+)
+
+PAGE_TIMEOUT = 20 # Page loads / client-side rendering
+LOGIN_WAIT = 300 # Manual Telegram login (non-headless only)
+
+def login_state(driver):
+    """
+    "user" / "guest" once the header has rendered, else None (for WebDriverWait).
+    Not logged in = "Guest 사장님" present
+    Logged in = "XXXX 사장님" present (so "사장님" is there, but "Guest 사장님" is not)
+    """
+    source = driver.page_source
+    if "사장님" not in source:
+        return None
+    return "guest" if "Guest 사장님" in source else "user"
+
+def form_ready(driver):
+    """The create form has rendered (category/city selects and the content textarea)."""
+    return len(driver.find_elements(By.TAG_NAME, "select")) >= 2 and bool(driver.find_elements(By.TAG_NAME, "textarea"))
 
 class WebPoster:
-    def __init__(self):
+    """
+    Selenium fallback poster. Logs in once per session and opens CREATE_URL directly
+    for every item; all waits are on DOM state, not fixed sleeps.
+    headless: run Chrome without a window (needs a profile that is already logged in).
+    driver_path: chromedriver to use; resolved with webdriver-manager when not given.
+    """
+    def __init__(self, headless=None, user_data_dir=None, driver_path=None):
         self.driver = None
+        self.driver_path = driver_path
+        self.headless = config.SELENIUM_HEADLESS if headless is None else headless
+        self.user_data_dir = user_data_dir or os.path.join(os.getcwd(), DEFAULT_PROFILE_DIR)
+        self.logged_in = False
 
     def setup_driver(self):
         if not self.driver:
             options = webdriver.ChromeOptions()
             options.add_argument("--no-sandbox")
             options.add_argument("--disable-dev-shm-usage")
+            if self.headless:
+                options.add_argument("--headless=new")
+                options.add_argument("--window-size=1280,2000")
             # User agent to look like a real browser
             options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
             
             # Persist profile to keep login
-            user_data_dir = os.path.join(os.getcwd(), "chrome_profile_blacklist")
-            options.add_argument(f"user-data-dir={user_data_dir}")
+            options.add_argument(f"user-data-dir={self.user_data_dir}")
             
-            print(f"Initializing WebDriver with profile: {user_data_dir}")
-            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+            print(f"Initializing WebDriver with profile: {self.user_data_dir}{' (headless)' if self.headless else ''}")
+            driver_path = self.driver_path or ChromeDriverManager().install()
+            self.driver = webdriver.Chrome(service=Service(driver_path), options=options)
 
     def login(self):
         """Handles login. If not logged in, waits for user interaction."""
@@ -40,71 +83,98 @@ class WebPoster:
         self.driver.get(LOGIN_URL)
         
         # Logic from Market/poster_b.py
-        # Not logged in = "Guest 사장님" present
-        # Logged in = "XXXX 사장님" present (so "사장님" is there, but "Guest 사장님" is not)
-        source = self.driver.page_source
-        is_guest = "Guest 사장님" in source
-        has_boss_text = "사장님" in source
+        try:
+            state = WebDriverWait(self.driver, PAGE_TIMEOUT).until(login_state)
+        except TimeoutException:
+            state = None
         
-        if has_boss_text and not is_guest:
+        if state == "user":
             print("Already logged in (Verified via '사장님' text).")
+            self.logged_in = True
             return True
+        
+        if self.headless:
+            print("Not logged in and running headless. Run once without headless mode to log in via Telegram.")
+            return False
             
         print("Not logged in (Found 'Guest 사장님' or missing '사장님'). Please log in via Telegram.")
         
         # Wait for user to log in
-        max_wait = 300 # 5 minutes
-        start_time = time.time()
-        while time.time() - start_time < max_wait:
-            source = self.driver.page_source
-            is_guest = "Guest 사장님" in source
-            has_boss_text = "사장님" in source
-            
-            if has_boss_text and not is_guest:
-                print("Login detected! ('사장님' found)")
-                # Save cookies
-                pickle.dump(self.driver.get_cookies(), open(COOKIES_FILE, "wb"))
-                return True
-            time.sleep(2)
+        try:
+            WebDriverWait(self.driver, LOGIN_WAIT, poll_frequency=2).until(lambda d: login_state(d) == "user")
+        except TimeoutException:
+            print("Login timed out.")
+            return False
         
-        print("Login timed out.")
-        return False
+        print("Login detected! ('사장님' found)")
+        # Save cookies
+        pickle.dump(self.driver.get_cookies(), open(COOKIES_FILE, "wb"))
+        self.logged_in = True
+        return True
+
+    def ensure_login(self):
+        """Logs in only if this session has not yet (once per batch instead of once per post)."""
+        return self.logged_in or self.login()
+
+    def open_create_form(self):
+        """
+        Opens the create form directly and waits until it has rendered.
+        Falls back to clicking through Home -> Blacklist -> Register (Nuxt.js client routing).
+        Returns False if the session turned out to be logged out.
+        """
+        self.driver.get(CREATE_URL)
+        wait = WebDriverWait(self.driver, PAGE_TIMEOUT)
+        try:
+            wait.until(lambda d: "login" in d.current_url or form_ready(d))
+        except TimeoutException:
+            print("Create form did not render from direct URL. Navigating via menu...")
+            self.driver.get(HOME_URL)
+            wait.until(EC.element_to_be_clickable((By.XPATH, "//*[contains(text(), '블랙리스트')]"))).click()
+            wait.until(EC.element_to_be_clickable(
+                (By.XPATH, "//*[contains(text(), '사례 등록') or contains(text(), '글쓰기')]")
+            )).click()
+            wait.until(lambda d: "login" in d.current_url or form_ready(d))
+        
+        # Check login redirect
+        if "login" in self.driver.current_url:
+            print("Redirected to login. Session might be invalid.")
+            self.logged_in = False
+            return False
+        return True
+
+    def post_batch(self, items, dry_run=False):
+        """
+        Posts several blacklist items in one browser session: one login, then the same
+        page is pointed at the create form for each item. Returns one bool per item.
+        """
+        if not self.ensure_login():
+            print("Cannot post: Not logged in.")
+            return [False] * len(items)
+        
+        results = []
+        for i, data in enumerate(items):
+            if len(items) > 1:
+                print(f"[{i + 1}/{len(items)}] Posting: {data.get('title', '')}")
+            results.append(self._post_one(data, dry_run))
+        return results
 
     def post_blacklist(self, data, dry_run=False):
         """
         Posts a blacklist item.
         data expects: {'title': str, 'damage_content': str, 'features': str, 'location_city': str, 'location_district': str, 'images': list}
         """
-        if not self.login():
-            print("Cannot post: Not logged in.")
-            return False
-            
-        # Navigate via clicks (Nuxt.js compatibility)
-        print("Navigating to Home...")
+        return self.post_batch([data], dry_run)[0]
+
+    def _post_one(self, data, dry_run=False):
         try:
-            self.driver.get("https://dool.co.kr/")
-            time.sleep(3)
-            
-            # Click Blacklist
-            print("Clicking 'Blacklist'...")
-            menu_btn = self.driver.find_element(By.XPATH, "//*[contains(text(), '블랙리스트')]")
-            menu_btn.click()
-            time.sleep(3)
-            
-            # Click Register
-            print("Clicking 'Register'...")
-            reg_btn = self.driver.find_element(By.XPATH, "//*[contains(text(), '사례 등록') or contains(text(), '글쓰기')]")
-            reg_btn.click()
-            time.sleep(3)
-            
+            opened = self.open_create_form()
+            if not opened and self.login(): # Session expired mid-batch: log in again once
+                opened = self.open_create_form()
+            if not opened:
+                return False
         except Exception as e:
             print(f"Navigation failed: {e}")
             return False
-        
-        # Check login redirect
-        if "login" in self.driver.current_url:
-            print("Redirected to login. Session might be invalid.")
-            return False
 
         if dry_run:
             print(f"[Dry Run] Data: {data}")
@@ -112,7 +182,6 @@ class WebPoster:
 
         try:
             # 0. Date
-            from datetime import datetime
             today_str = datetime.now().strftime("%Y-%m-%d")
             incident_date = data.get('incident_date', today_str)
             try:
@@ -155,13 +224,17 @@ class WebPoster:
                         city_select = Select(selects[1])
                         city_select.select_by_visible_text(city)
                         print(f"Selected City: {city}")
-                        time.sleep(1) # Wait for District to populate
                         
                         # C. District
                         if district and len(selects) >= 3:
-                            # Re-fetch selects? No, reference should hold, but DOM updates might require re-fetch if element reduced.
-                            # Usually Vue updates the options inside the select, not the select element itself.
-                            district_select = Select(selects[2])
+                            # Wait for Vue to populate the district options for this city
+                            try:
+                                WebDriverWait(self.driver, 10).until(
+                                    lambda d: len(Select(d.find_elements(By.TAG_NAME, "select")[2]).options) > 1
+                                )
+                            except TimeoutException:
+                                print("District options did not load.")
+                            district_select = Select(self.driver.find_elements(By.TAG_NAME, "select")[2])
                             try:
                                 district_select.select_by_visible_text(district)
                                 print(f"Selected District: {district}")
@@ -206,7 +279,6 @@ class WebPoster:
                 try:
                     file_input = self.driver.find_element(By.ID, "common-file-input")
                     # Join absolute paths
-                    import os
                     abs_paths = [os.path.abspath(p) for p in images]
                     paths_str = "\n".join(abs_paths)
                     file_input.send_keys(paths_str)
@@ -263,7 +335,11 @@ class WebPoster:
                 except TimeoutException:
                     print("Alert 2 not found (timed out/server slow?).")
 
-                time.sleep(3)
+                # The app leaves the create form once the post is saved
+                try:
+                    WebDriverWait(self.driver, 10).until(lambda d: "create" not in d.current_url)
+                except TimeoutException:
+                    pass
                 return True
             else:
                 print("Could not find Submit button.")
@@ -276,3 +352,90 @@ class WebPoster:
     def close(self):
         if self.driver:
             self.driver.quit()
+            self.driver = None
+
+def clone_profile(source, target):
+    """
+    Copies a logged-in Chrome profile (cookies / local storage) to target, replacing any older copy.
+    Each pool driver needs its own user-data-dir: Chrome refuses to share one between processes.
+    """
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    shutil.copytree(source, target, ignore=PROFILE_COPY_IGNORE)
+
+class WebPosterPool:
+    """
+    N headless WebPosters, each with its own clone of the logged-in profile, fed from one
+    dispatch queue. While one browser waits for the in-page Face-API / OCR image processing
+    (up to 120s), the others keep filling forms, so throughput grows with the pool size.
+    """
+    def __init__(self, size=None, headless=True, profile_dir=None):
+        self.size = max(1, size or config.SELENIUM_POOL_SIZE)
+        self.headless = headless
+        self.profile_dir = profile_dir or os.path.join(os.getcwd(), DEFAULT_PROFILE_DIR)
+        self.posters = []
+
+    def start(self):
+        """Clones the profile, resolves chromedriver and creates the posters (drivers start in their worker threads)."""
+        if self.posters:
+            return
+        if not os.path.isdir(self.profile_dir):
+            raise FileNotFoundError(
+                f"Profile {self.profile_dir} not found. Log in once with the single (non-headless) WebPoster first."
+            )
+        # Resolved once: N threads running webdriver-manager at the same time race on its download cache
+        driver_path = ChromeDriverManager().install()
+        print(f"Cloning {self.profile_dir} for {self.size} pool drivers...")
+        for i in range(self.size):
+            target = os.path.join(os.getcwd(), POOL_PROFILE_DIR, str(i))
+            clone_profile(self.profile_dir, target)
+            self.posters.append(WebPoster(headless=self.headless, user_data_dir=target, driver_path=driver_path))
+
+    def post_batch(self, items, dry_run=False):
+        """
+        Posts the items in parallel. Returns one bool per item, in the order given.
+        Items left over because every driver failed to log in count as failed.
+        """
+        self.start()
+        results = [False] * len(items)
+        jobs = queue.Queue()
+        for i, data in enumerate(items):
+            jobs.put((i, data))
+
+        def worker(n, poster):
+            try:
+                if not poster.ensure_login():
+                    print(f"[Pool {n}] Not logged in. Profile clone has no valid session; worker stopped.")
+                    return
+            except Exception as e:
+                print(f"[Pool {n}] Driver start failed: {e}")
+                return
+            while True:
+                try:
+                    i, data = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                print(f"[Pool {n}] [{i + 1}/{len(items)}] Posting: {data.get('title', '')}")
+                results[i] = poster.post_batch([data], dry_run)[0]
+
+        threads = [
+            threading.Thread(target=worker, args=(n, poster), name=f"selenium-pool-{n}", daemon=True)
+            for n, poster in enumerate(self.posters[:len(items)])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not jobs.empty():
+            print(f"{jobs.qsize()} items were not posted (no logged-in driver left).")
+        print(f"Pool posted {sum(results)}/{len(items)} items with {len(threads)} drivers.")
+        return results
+
+    def close(self):
+        for poster in self.posters:
+            try:
+                poster.close()
+            except Exception as e:
+                print(f"Error closing pool driver: {e}")
+        self.posters = []
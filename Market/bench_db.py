@@ -0,0 +1,74 @@
+"""
+Benchmark: per-link DB cost of the previous connect-per-call Market/db.py vs the pooled WAL
+connection, on a backlog of already posted listings.
+
+Usage:
+    python bench_db.py [posted_rows] [backlog_links]
+"""
+import datetime
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+import db
+
+def legacy_is_posted(post_id):
+    conn = sqlite3.connect(db.DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute('SELECT 1 FROM posts WHERE id = ?', (post_id,))
+    result = cursor.fetchone()
+    conn.close()
+    return result is not None
+
+def legacy_save_post(post_id, title):
+    conn = sqlite3.connect(db.DB_NAME)
+    cursor = conn.cursor()
+    now = datetime.datetime.now()
+    cursor.execute('''
+        INSERT INTO posts (id, title, crawled_at, posted_at)
+        VALUES (?, ?, ?, ?)
+    ''', (post_id, title, now, now))
+    conn.commit()
+    conn.close()
+
+def timed(label, fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<42} {elapsed * 1000:9.1f} ms  ({elapsed / n * 1e6:8.1f} us/link)")
+    return elapsed
+
+def main():
+    posted_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    backlog = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, 'bench.db')
+        db.init_db()
+        posted = [str(uuid.uuid4()) for _ in range(posted_rows)]
+        for post_id in posted:
+            db.save_post(post_id, "title")
+
+        # Half of the backlog is already posted
+        links = posted[:backlog // 2] + [str(uuid.uuid4()) for _ in range(backlog - backlog // 2)]
+        new_ids = [str(uuid.uuid4()) for _ in range(backlog)]
+        new_ids_pooled = [str(uuid.uuid4()) for _ in range(backlog)]
+        print(f"{posted_rows} posted rows, backlog of {backlog} links\n")
+
+        # Legacy functions open their own connections; the shared one stays idle meanwhile
+        old_check = timed("is_posted, connect per call (before)", lambda: [legacy_is_posted(i) for i in links], backlog)
+        new_check = timed("is_posted, pooled WAL connection", lambda: [db.is_posted(i) for i in links], backlog)
+        batch = timed("filter_unposted, one batched query", lambda: db.filter_unposted(links), backlog)
+        assert db.filter_unposted(links) == [i for i in links if not legacy_is_posted(i)]
+
+        old_save = timed("save_post, connect per call (before)", lambda: [legacy_save_post(i, "t") for i in new_ids], backlog)
+        new_save = timed("save_post, pooled WAL upsert", lambda: [db.save_post(i, "t") for i in new_ids_pooled], backlog)
+
+        print(f"\nLookup: {old_check / new_check:.0f}x faster pooled, {old_check / batch:.0f}x faster batched. "
+              f"Save: {old_save / new_save:.1f}x faster.")
+        db.close_db()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: flight_parser.find_record (with KeyLookup) vs the previous per-character parser of PCNalaScraper.
+
+Usage:
+    python bench_flight_parser.py                 # cached pages in page_cache/pcnala, else a synthetic page
+    python bench_flight_parser.py page.html ...   # saved detail pages
+"""
+import glob
+import json
+import os
+import sys
+import timeit
+import flight_parser
+
+PAGE_CACHE_DIR = os.path.join("page_cache", "pcnala") # As in scraper_pcnala
+
+def find_key(obj, key):
+    """The previous PCNalaScraper.find_key."""
+    if isinstance(obj, dict):
+        if key in obj:
+            return obj[key]
+        for k, v in obj.items():
+            if isinstance(v, (dict, list)):
+                res = find_key(v, key)
+                if res: return res
+    elif isinstance(obj, list):
+        for item in obj:
+            res = find_key(item, key)
+            if res: return res
+    return None
+
+def legacy_find_trade(html):
+    """The previous parse_detail parsing, minus map_to_api."""
+    search_str = 'self.__next_f.push(['
+    start_pos = 0
+    chunks = {}
+
+    while True:
+        idx = html.find(search_str, start_pos)
+        if idx == -1:
+            break
+        content_start = idx + len(search_str)
+        stack = 1
+        in_quote = False
+        escape = False
+        extract_end = -1
+
+        for i in range(content_start, len(html)):
+            char = html[i]
+            if escape:
+                escape = False
+                continue
+            if char == '\\':
+                escape = True
+                continue
+            if char == '"':
+                in_quote = not in_quote
+            if not in_quote:
+                if char == '[':
+                    stack += 1
+                elif char == ']':
+                    stack -= 1
+                    if stack == 0:
+                        extract_end = i
+                        break
+
+        if extract_end != -1:
+            try:
+                chunk = json.loads(f"[{html[content_start:extract_end]}]")
+                if isinstance(chunk, list) and len(chunk) >= 2 and isinstance(chunk[1], str):
+                    if chunk[0] not in chunks:
+                        chunks[chunk[0]] = ""
+                    chunks[chunk[0]] += chunk[1]
+            except json.JSONDecodeError:
+                pass
+        start_pos = idx + 1
+
+    for full_data in chunks.values():
+        for line in full_data.split('\n'):
+            if not line.strip(): continue
+            if '"trade":' in line or '\\"trade\\":' in line:
+                try:
+                    json_str = line
+                    if ':' in line[:5]:
+                        parts = line.split(':', 1)
+                        if len(parts) > 1 and parts[1].startswith(('[', '{', '"')):
+                            json_str = parts[1]
+                    data = json.loads(json_str)
+                    if isinstance(data, (dict, list)):
+                        trade = find_key(data, 'trade')
+                        if trade:
+                            return trade
+                except json.JSONDecodeError:
+                    pass
+    return None
+
+def synthetic_page(rows=400, push_size=2000):
+    """A detail page shaped like pcnala's: layout rows, the trade row, then more component rows."""
+    def component(i):
+        return ["$", "div", None, {"className": f"c{i}", "children": [
+            ["$", "span", None, {"children": f"텍스트 {i} " * 20}] for _ in range(5)
+        ]}]
+
+    trade = {
+        "title": "서울 강남구 PC방 양도", "content": "시설 좋음 " * 200, "region": "서울", "sub_region": "강남구",
+        "deposit": 5000, "monthly_rent": 300, "premium": 8000, "area_size": 60, "floor": 2,
+        "facilities": "PC 80대, 카운터", "trade_images": [{"image_url": f"https://pcnala.com/img/{i}.jpg", "display_order": i} for i in range(10)]
+    }
+    lines = [f"{i:x}:{json.dumps(component(i), ensure_ascii=False)}" for i in range(rows // 2)]
+    lines.append(f"{rows // 2:x}:" + json.dumps(["$", "main", None, {"children": [["$", "section", None, {"trade": trade}]]}], ensure_ascii=False))
+    lines += [f"{i:x}:{json.dumps(component(i), ensure_ascii=False)}" for i in range(rows // 2 + 1, rows)]
+    payload = "\n".join(lines) + "\n"
+
+    scripts = ['<script>(self.__next_f=self.__next_f||[]).push([0])</script>']
+    for i in range(0, len(payload), push_size):
+        scripts.append(f'<script>self.__next_f.push({json.dumps([1, payload[i:i + push_size]], ensure_ascii=False)})</script>')
+    return "<html><head>" + "<link rel='stylesheet'>" * 50 + "</head><body>" + "".join(scripts) + "</body></html>"
+
+def main():
+    paths = sys.argv[1:] or [p for p in glob.glob(os.path.join(PAGE_CACHE_DIR, "*")) if "." not in os.path.basename(p)]
+    pages = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path)[:16], f.read().decode('utf-8', errors='replace')))
+    if not pages:
+        pages = [("synthetic", synthetic_page())]
+
+    total_old = total_new = 0.0
+    for name, html in pages:
+        expected = legacy_find_trade(html)
+        lookup = flight_parser.KeyLookup() # As used by the scraper; learns the path on the first call
+        if flight_parser.find_record(html, 'trade', lookup) != expected:
+            print(f"{name}: MISMATCH between parsers")
+            continue
+        n = 5
+        old = min(timeit.repeat(lambda: legacy_find_trade(html), number=n, repeat=3)) / n
+        new = min(timeit.repeat(lambda: flight_parser.find_record(html, 'trade', lookup), number=n, repeat=3)) / n
+        total_old += old
+        total_new += new
+        print(f"{name}: {len(html) / 1024:.0f} KB, legacy {old * 1000:.1f} ms, flight_parser {new * 1000:.2f} ms "
+              f"({old / new:.0f}x){'' if expected else ' (no trade record)'}")
+
+    if total_new:
+        print(f"Total: legacy {total_old * 1000:.1f} ms, flight_parser {total_new * 1000:.2f} ms ({total_old / total_new:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Sample-based check of listing_features: every sample goes through the scalar path
+(extract) and the batch path (extract_batch; vectorized with pandas, the plain loop otherwise).
+
+Usage:
+    python check_listing_features.py
+"""
+import sys
+import listing_features
+
+# (text, pcCount, managementFee, averageMonthlyRevenue), amounts in 만원
+SAMPLES = [
+    ("PC 50대 관리비 30만원 월매출 1,500만원", 50, 30, 1500),
+    ("피씨: 80 / 매출 1억5천", 80, 0, 15000),
+    ("컴퓨터 60대, 월 평균 매출 약 2천만원", 60, 0, 2000),
+    ("매출 1억 2천만원, 관리비 월 45만", 0, 45, 12000),
+    ("매출 1억 2,000만원", 0, 0, 12000),
+    ("매출액: 1.5억", 0, 0, 15000),
+    ("매출 2천 500만", 0, 0, 2500),
+    ("관리비 300,000원", 0, 30, 0),
+    ("컴퓨터 2023년식 교체, 좌석 72석", 72, 0, 0),
+    ("PC 2023 년 전체 교체", 0, 0, 0),
+    ("", 0, 0, 0),
+]
+
+KEYS = ("pcCount", "managementFee", "averageMonthlyRevenue")
+
+def main():
+    sys.stdout.reconfigure(encoding='utf-8')
+    failures = 0
+    batch = listing_features.extract_batch(text for text, *_ in SAMPLES)
+    path = "pandas" if listing_features.pd is not None else "fallback loop"
+
+    for i, (text, *expected) in enumerate(SAMPLES):
+        expected = dict(zip(KEYS, expected))
+        scalar = listing_features.extract(text)
+        vectorized = {key: batch[key][i] for key in KEYS}
+        for name, got in (("extract", scalar), (f"extract_batch ({path})", vectorized)):
+            if got != expected:
+                failures += 1
+                print(f"FAIL {name}: {text!r}\n  expected {expected}\n  got      {got}")
+
+    print(f"{len(SAMPLES)} samples, batch path: {path}, {failures} failures.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import sys
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+# Shared modules (common/) live at the project root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+SOURCE_CHAT = os.getenv("MARKET_SOURCE_CHAT_ID", "holempub_adultpc")
+
+# Adaptive scheduler (--schedule), seconds
+SCHEDULE_MIN_INTERVAL = int(os.getenv("SCHEDULE_MIN_INTERVAL", 300))
+SCHEDULE_MAX_INTERVAL = int(os.getenv("SCHEDULE_MAX_INTERVAL", 3 * 3600))
+SCHEDULE_TARGET_PER_POLL = float(os.getenv("SCHEDULE_TARGET_PER_POLL", 5))
+SCHEDULE_JITTER = float(os.getenv("SCHEDULE_JITTER", 0.2))
+
+# Image normalization before upload
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 1600)) # px, longest side
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", 82))
+NORMALIZED_CACHE_MAX_BYTES = int(os.getenv("NORMALIZED_CACHE_MAX_BYTES", 256 * 1024 * 1024)) # image_cache/normalized
+
+# Listing images larger than this are relayed via a temp file instead of memory
+IMAGE_RELAY_SPILL_THRESHOLD = int(os.getenv("IMAGE_RELAY_SPILL_THRESHOLD", 8 * 1024 * 1024))
+
+# Listing image cache (keyed by URL, LRU-evicted)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+IMAGE_CACHE_MAX_AGE = int(os.getenv("IMAGE_CACHE_MAX_AGE", 7 * 24 * 3600)) # seconds before revalidation
+
+# Scraping pipeline: pcnala requests per second (token bucket per host) and burst,
+# concurrent scrapers, concurrent dool uploads
+PCNALA_RATE_PER_SEC = float(os.getenv("PCNALA_RATE_PER_SEC", 0.5))
+PCNALA_BURST = int(os.getenv("PCNALA_BURST", 2))
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", 2))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", 2))
+
+# pcnala detail page cache (re-checked with conditional GETs)
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", 0)) # seconds served without revalidation
+
+# Compressed archive of every downloaded detail page (offline reprocessing with reprocess.py)
+ARCHIVE_PAGES = os.getenv("ARCHIVE_PAGES", "1") == "1"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "page_archive")
+ARCHIVE_KEEP_VERSIONS = int(os.getenv("ARCHIVE_KEEP_VERSIONS", 3)) # per listing, 0 = keep all
+
+# dool.co.kr API client
+DOOL_POOL_SIZE = int(os.getenv("DOOL_POOL_SIZE", 10))
+DOOL_CONNECT_TIMEOUT = float(os.getenv("DOOL_CONNECT_TIMEOUT", 5))
+DOOL_READ_TIMEOUT = float(os.getenv("DOOL_READ_TIMEOUT", 60))
+DOOL_MAX_RETRIES = int(os.getenv("DOOL_MAX_RETRIES", 3))
+
+# HTTP transport: "requests" (blocking, default) or "httpx" (async, HTTP/2)
+HTTP_TRANSPORT = os.getenv("HTTP_TRANSPORT", "requests").lower()
@@ -1,43 +1,211 @@
 import sqlite3
 import datetime
+import json
+import threading
+import time
 
 DB_NAME = 'crawled_data.db'
 
+# Link states (links table)
+DISCOVERED = 'DISCOVERED' # Seen in Telegram, not scraped yet
+SCRAPED = 'SCRAPED'       # Payload cached, waiting for upload
+POSTED = 'POSTED'
+FAILED = 'FAILED'         # Retried at next_retry until MAX_ATTEMPTS
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 15 * 60 # Doubles per attempt
+RETRY_MAX_DELAY = 24 * 3600
+
+# SQLite's default limit on host parameters per statement (older builds)
+MAX_QUERY_PARAMS = 900
+
+# One shared connection (WAL) instead of a connect/close per call
+_conn = None
+_lock = threading.Lock()
+
+def _connection():
+    """Returns the process-wide connection, opening it on first use. Caller holds _lock."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        # WAL: readers never block the writer; NORMAL sync is durable across app crashes
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+    return _conn
+
+def close_db():
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
 def init_db():
     """Initialize the database table if it doesn't exist."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS posts (
-            id TEXT PRIMARY KEY,
-            title TEXT,
-            crawled_at TIMESTAMP,
-            posted_at TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS posts (
+                    id TEXT PRIMARY KEY,
+                    title TEXT,
+                    crawled_at TIMESTAMP,
+                    posted_at TIMESTAMP
+                )
+            ''')
+            # Durable work queue: every discovered link is recorded before the Telegram checkpoint moves
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS links (
+                    id TEXT PRIMARY KEY,
+                    url TEXT,
+                    message_id INTEGER,
+                    status TEXT DEFAULT 'DISCOVERED',
+                    attempts INTEGER DEFAULT 0,
+                    next_retry REAL,
+                    payload TEXT,
+                    last_error TEXT,
+                    discovered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_links_status ON links(status, next_retry)')
+
+            # Re-sync bookkeeping on posts (added later; older databases are migrated in place)
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(posts)')}
+            for name, decl in (("remote_id", "TEXT"), ("content_hash", "TEXT"), ("checked_at", "REAL")):
+                if name not in columns:
+                    conn.execute(f'ALTER TABLE posts ADD COLUMN {name} {decl}')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_checked ON posts(checked_at)')
 
 def is_posted(post_id):
     """Check if a post_id has already been processed."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute('SELECT 1 FROM posts WHERE id = ?', (post_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result is not None
-
-def save_post(post_id, title):
-    """Save a new post record."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    with _lock:
+        row = _connection().execute('SELECT 1 FROM posts WHERE id = ?', (post_id,)).fetchone()
+    return row is not None
+
+def filter_unposted(post_ids):
+    """Returns the ids (in the given order) that are not posted yet, in one query per 900 ids."""
+    post_ids = list(post_ids)
+    posted = set()
+    with _lock:
+        conn = _connection()
+        for i in range(0, len(post_ids), MAX_QUERY_PARAMS):
+            batch = post_ids[i:i + MAX_QUERY_PARAMS]
+            placeholders = ','.join('?' * len(batch))
+            posted.update(row[0] for row in conn.execute(f'SELECT id FROM posts WHERE id IN ({placeholders})', batch))
+    return [post_id for post_id in post_ids if post_id not in posted]
+
+def save_post(post_id, title, remote_id=None, content_hash=None):
+    """
+    Save a post record (upsert: posting the same id twice just refreshes it).
+    remote_id: the dool product id, content_hash: listing_hash() of the posted payload.
+    """
     now = datetime.datetime.now()
-    cursor.execute('''
-        INSERT INTO posts (id, title, crawled_at, posted_at)
-        VALUES (?, ?, ?, ?)
-    ''', (post_id, title, now, now))
-    conn.commit()
-    conn.close()
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute('''
+                INSERT INTO posts (id, title, crawled_at, posted_at, remote_id, content_hash, checked_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    posted_at = excluded.posted_at,
+                    remote_id = COALESCE(excluded.remote_id, remote_id),
+                    content_hash = COALESCE(excluded.content_hash, content_hash),
+                    checked_at = excluded.checked_at
+            ''', (post_id, title, now, now, remote_id, content_hash, time.time()))
+
+def get_posts_for_resync():
+    """Posted listings as dicts (id, remote_id, content_hash), never checked first, then least recently checked."""
+    with _lock:
+        rows = _connection().execute('''
+            SELECT id, remote_id, content_hash FROM posts
+            ORDER BY checked_at IS NOT NULL, checked_at
+        ''').fetchall()
+    return [{"id": row[0], "remote_id": row[1], "content_hash": row[2]} for row in rows]
+
+def record_check(post_id, content_hash=None):
+    """Marks a posted listing as re-checked now, storing its new content hash if given."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute('''
+                UPDATE posts SET checked_at = ?, content_hash = COALESCE(?, content_hash) WHERE id = ?
+            ''', (time.time(), content_hash, post_id))
+
+def add_link(link_id, url, message_id):
+    """Records a discovered link. Returns False if it was already known (in any state)."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO links (id, url, message_id, status, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (link_id, url, message_id, DISCOVERED, datetime.datetime.now()))
+    return cursor.rowcount > 0
+
+def get_due_links():
+    """
+    Links left over from earlier runs that need work now: DISCOVERED, SCRAPED, and FAILED
+    ones whose next_retry has passed. Oldest message first.
+    Returns dicts with id, url, message_id, status, attempts and payload (decoded or None).
+    """
+    with _lock:
+        rows = _connection().execute('''
+            SELECT id, url, message_id, status, attempts, payload FROM links
+            WHERE status IN (?, ?) OR (status = ? AND next_retry <= ?)
+            ORDER BY message_id
+        ''', (DISCOVERED, SCRAPED, FAILED, time.time())).fetchall()
+    return [{
+        "id": row[0],
+        "url": row[1],
+        "message_id": row[2],
+        "status": row[3],
+        "attempts": row[4],
+        "payload": json.loads(row[5]) if row[5] else None
+    } for row in rows]
+
+def save_scraped(link_id, payload):
+    """Caches the scraped payload so a failed upload never needs a re-scrape."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute('''
+                UPDATE links SET status = ?, payload = ?, next_retry = NULL, updated_at = ? WHERE id = ?
+            ''', (SCRAPED, json.dumps(payload, ensure_ascii=False), datetime.datetime.now(), link_id))
+
+def mark_posted(link_ids):
+    """Marks one link id or a list of them as POSTED, in one transaction."""
+    if isinstance(link_ids, str):
+        link_ids = [link_ids]
+    now = datetime.datetime.now()
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.executemany('''
+                UPDATE links SET status = ?, next_retry = NULL, last_error = NULL, updated_at = ? WHERE id = ?
+            ''', [(POSTED, now, link_id) for link_id in link_ids])
+
+def mark_failed(link_id, error):
+    """
+    Counts a failed attempt and schedules a retry with exponential backoff.
+    After MAX_ATTEMPTS the link stays FAILED without next_retry (given up).
+    Returns the retry timestamp, or None if given up.
+    """
+    with _lock:
+        conn = _connection()
+        with conn:
+            row = conn.execute('SELECT attempts FROM links WHERE id = ?', (link_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+
+            next_retry = None
+            if attempts < MAX_ATTEMPTS:
+                next_retry = time.time() + min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+            conn.execute('''
+                UPDATE links SET status = ?, attempts = ?, next_retry = ?, last_error = ?, updated_at = ? WHERE id = ?
+            ''', (FAILED, attempts, next_retry, error, datetime.datetime.now(), link_id))
+    return next_retry
 
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,201 @@
+import json
+import re
+
+# Next.js App Router pages stream their React tree ("flight" data) as
+#   <script>self.__next_f.push([1,"<rows>"])</script>
+# where the concatenated strings of one chunk id form newline-separated rows "<hex id>:<JSON>".
+PUSH_MARKER = 'self.__next_f.push('
+
+_decoder = json.JSONDecoder()
+_ROW_ID = re.compile(r'[0-9a-fA-F]+:')
+
+def iter_pushes(html):
+    """
+    Yields (chunk_id, string) for every self.__next_f.push([...]) call in the page.
+    Each call is decoded with raw_decode at the marker, so brackets and quotes are
+    matched by the C JSON scanner instead of a Python loop.
+    """
+    pos = html.find(PUSH_MARKER)
+    while pos != -1:
+        start = pos + len(PUSH_MARKER)
+        end = start
+        try:
+            chunk, end = _decoder.raw_decode(html, start)
+        except json.JSONDecodeError:
+            pass
+        else:
+            if isinstance(chunk, list) and len(chunk) >= 2 and isinstance(chunk[1], str):
+                yield chunk[0], chunk[1]
+        pos = html.find(PUSH_MARKER, end)
+
+def flight_payload(html):
+    """Returns {chunk_id: concatenated string}, each joined once."""
+    parts = {}
+    for chunk_id, data in iter_pushes(html):
+        parts.setdefault(chunk_id, []).append(data)
+    return {chunk_id: ''.join(p) for chunk_id, p in parts.items()}
+
+def decode_row(line):
+    """Decodes one flight row, stripping its "<hex id>:" prefix. Raises ValueError if it is not JSON."""
+    m = _ROW_ID.match(line)
+    if m and line[m.end():m.end() + 1] in ('[', '{', '"'):
+        line = line[m.end():]
+    return json.loads(line)
+
+class _RowBuffer:
+    """Accumulates one chunk id's strings and hands out complete rows that mention the key."""
+    def __init__(self, needle):
+        self.needle = needle
+        self.parts = []
+        self.done = 0 # Rows before this offset have been examined
+        self.pending = False # Needle seen in a row that is not complete yet
+        self.tail = ''
+
+    def feed(self, data):
+        self.parts.append(data)
+        # The needle may straddle pushes
+        window = self.tail + data
+        if not self.pending:
+            self.pending = self.needle in window
+        self.tail = window[-(len(self.needle) - 1):]
+        return self.pending and '\n' in data
+
+    def rows(self, final=False):
+        """Yields complete rows containing the needle that were not examined yet."""
+        text = ''.join(self.parts)
+        self.parts = [text]
+        end = len(text) if final else text.rfind('\n')
+        idx = text.find(self.needle, self.done, end)
+        while idx != -1:
+            row_start = text.rfind('\n', 0, idx) + 1
+            row_end = text.find('\n', idx, end)
+            if row_end == -1:
+                row_end = end
+            yield text[row_start:row_end]
+            idx = text.find(self.needle, row_end, end)
+        self.done = end + 1
+        self.pending = text.find(self.needle, self.done) != -1
+
+def find_record(html, key, lookup):
+    """
+    Returns the first value lookup(row, key) finds (not None) in a flight row mentioning
+    "key":, or None. Rows are decoded only if they contain the key, and parsing stops
+    as soon as the record is found, without decoding the rest of the page.
+    """
+    needle = f'"{key}":'
+    buffers = {}
+
+    def search(rows):
+        for line in rows:
+            if not line.strip():
+                continue
+            try:
+                data = decode_row(line)
+            except ValueError:
+                continue
+            if isinstance(data, (dict, list)):
+                found = lookup(data, key)
+                if found is not None:
+                    return found
+        return None
+
+    for chunk_id, data in iter_pushes(html):
+        buf = buffers.get(chunk_id)
+        if buf is None:
+            buf = buffers[chunk_id] = _RowBuffer(needle)
+        if buf.feed(data):
+            found = search(buf.rows())
+            if found is not None:
+                return found
+
+    # Last rows are not newline-terminated
+    for buf in buffers.values():
+        if buf.pending:
+            found = search(buf.rows(final=True))
+            if found is not None:
+                return found
+    return None
+
+class KeyLookup:
+    """
+    Finds `key` in decoded rows, trying the path (dict keys / list indexes) where it was
+    found last time first. Only on a miss is the row walked, iteratively, and the new
+    path learned. A key present with a null value counts as not found.
+
+    stats: hits (remembered path worked), misses (path relearned by a walk),
+    not_found (walked, key absent). A run of misses means the page layout changed.
+    """
+    def __init__(self):
+        self.path = None
+        self.stats = {"hits": 0, "misses": 0, "not_found": 0}
+
+    def __call__(self, obj, key):
+        if self.path is not None:
+            value = self._follow(obj, key)
+            if value is not None:
+                self.stats["hits"] += 1
+                return value
+
+        path, value = self._walk(obj, key)
+        if path is None:
+            self.stats["not_found"] += 1
+            return None
+        if self.path is not None and path != self.path:
+            print(f"[KeyLookup] '{key}' moved: {list(self.path)} -> {list(path)}")
+        self.path = path
+        self.stats["misses"] += 1
+        return value
+
+    def _follow(self, obj, key):
+        for step in self.path:
+            if isinstance(obj, dict):
+                if isinstance(step, int):
+                    return None
+                obj = obj.get(step)
+            elif isinstance(obj, list):
+                if not isinstance(step, int) or step >= len(obj):
+                    return None
+                obj = obj[step]
+            else:
+                return None
+        if isinstance(obj, dict):
+            return obj.get(key)
+        return None
+
+    def _walk(self, obj, key):
+        """
+        Depth-first, pre-order like the old recursive find_key. Returns (path, value) or (None, None).
+        Only containers are stacked; a path is built only for the match, from parent links.
+        """
+        # Stack entries: (container, index of parent entry in `visited`, step from parent)
+        stack = [(obj, -1, None)]
+        visited = []
+        while stack:
+            node, parent, step = stack.pop()
+            here = len(visited)
+            visited.append((parent, step))
+
+            if isinstance(node, dict):
+                value = node.get(key)
+                if value is not None:
+                    path = []
+                    while here > 0:
+                        here, step = visited[here]
+                        path.append(step)
+                    path.reverse()
+                    return tuple(path), value
+                # Pushed in reverse so children are visited in order
+                for k in reversed(node):
+                    v = node[k]
+                    if isinstance(v, (dict, list)):
+                        stack.append((v, here, k))
+            else:
+                for i in range(len(node) - 1, -1, -1):
+                    v = node[i]
+                    if isinstance(v, (dict, list)):
+                        stack.append((v, here, i))
+        return None, None
+
+    def hit_rate(self):
+        found = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / found if found else 0.0
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Entries younger than this are served without any network request;
+# older ones are revalidated with If-None-Match / If-Modified-Since.
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+class HttpCache:
+    """
+    On-disk cache of HTTP response bodies keyed by URL, capped at max_bytes with LRU eviction.
+    Used for listing images (image relay) and pcnala detail pages (scraper), one directory each.
+    Stores ETag / Last-Modified so stale entries can be revalidated with a conditional GET.
+    Thread-safe; shared by the Market poster and re-sync jobs.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, label="HTTP cache"):
+        self.cache_dir = cache_dir
+        self.label = label # Used in print_summary()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                path TEXT,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_access REAL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)')
+        self.conn.commit()
+
+    def _path_for(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest())
+
+    def lookup(self, url):
+        """
+        Returns the cached entry as a dict (path, size, etag, last_modified, fresh), or None.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT path, size, etag, last_modified, fetched_at FROM entries WHERE url = ?', (url,)
+            ).fetchone()
+            if not row:
+                return None
+            if not os.path.exists(row[0]):
+                self.conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+                self.conn.commit()
+                return None
+            self.conn.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), url))
+            self.conn.commit()
+
+        return {
+            "path": row[0],
+            "size": row[1],
+            "etag": row[2],
+            "last_modified": row[3],
+            "fresh": time.time() - row[4] < self.max_age,
+        }
+
+    def record_hit(self, url, revalidated=False):
+        """Counts a hit; revalidated=True also resets the entry's age after a 304."""
+        with self.lock:
+            if revalidated:
+                self.stats["revalidated"] += 1
+                self.conn.execute('UPDATE entries SET fetched_at = ? WHERE url = ?', (time.time(), url))
+                self.conn.commit()
+            else:
+                self.stats["hits"] += 1
+
+    def invalidate(self, url):
+        """Drops the entry for url, so the next fetch is a full (unconditional) download."""
+        with self.lock:
+            row = self.conn.execute('SELECT path FROM entries WHERE url = ?', (url,)).fetchone()
+            if not row:
+                return
+            try:
+                os.remove(row[0])
+            except OSError:
+                pass
+            self.conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+            self.conn.commit()
+
+    def store(self, url, data, etag=None, last_modified=None):
+        """Saves downloaded bytes (or moves a downloaded file path) into the cache. Returns the cached path."""
+        path = self._path_for(url)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+
+        if isinstance(data, (bytes, bytearray)):
+            with open(tmp, 'wb') as f:
+                f.write(data)
+        else:
+            shutil.move(data, tmp) # Copies if the file is on another filesystem (e.g. tmpfs /tmp)
+        os.replace(tmp, path) # Atomic
+        size = os.path.getsize(path)
+
+        now = time.time()
+        with self.lock:
+            self.stats["misses"] += 1
+            self.conn.execute('''
+                INSERT OR REPLACE INTO entries (url, path, size, etag, last_modified, fetched_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, path, size, etag, last_modified, now, now))
+            self.conn.commit()
+            self._evict()
+        return path
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes. Caller holds the lock."""
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Entries touched in the last minute may be in use by an upload right now
+        rows = self.conn.execute(
+            'SELECT url, path, size FROM entries WHERE last_access < ? ORDER BY last_access', (time.time() - 60,)
+        ).fetchall()
+        for url, path, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.conn.execute('DELETE FROM entries WHERE url = ?', (url,))
+            total -= size
+        self.conn.commit()
+
+    def hit_rate(self):
+        hits = self.stats["hits"] + self.stats["revalidated"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def print_summary(self):
+        s = self.stats
+        if not any(s.values()):
+            return
+        print(f"{self.label}: {s['hits']} hits, {s['revalidated']} revalidated (304), {s['misses']} misses "
+              f"({self.hit_rate():.0%} hit rate).")
+
+    def close(self):
+        self.conn.close()
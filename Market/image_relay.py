@@ -0,0 +1,141 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+CHUNK_SIZE = 64 * 1024
+# Images above this size spill to a temp file instead of staying in memory
+SPILL_THRESHOLD = 8 * 1024 * 1024
+# Concurrent image downloads (also the keep-alive pool size per host)
+PREFETCH_WORKERS = 6
+# (connect, read) seconds; read is the longest silence between chunks, so a stalled
+# image server fails the download instead of hanging an upload worker on .result()
+TIMEOUT = (10, 30)
+
+class ImageRelay:
+    """
+    Downloads listing images straight into memory for the outgoing multipart request.
+    Only images larger than spill_threshold are written to a temp file.
+    Without a cache, keeps counters of what the old download -> temp file -> reopen path would have cost.
+    prefetch() downloads a listing's images concurrently over pooled keep-alive connections.
+    """
+    def __init__(self, spill_threshold=SPILL_THRESHOLD, workers=PREFETCH_WORKERS, cache=None, timeout=TIMEOUT):
+        self.spill_threshold = spill_threshold
+        self.timeout = timeout
+        self.cache = cache # Optional HttpCache
+        # Separate from the API session so the dool bearer token never goes to pcnala
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+        self.lock = threading.Lock() # Guards stats across prefetch threads
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        })
+        self.stats = {"in_memory": 0, "spilled": 0, "bytes": 0, "disk_bytes_avoided": 0, "syscalls_avoided": 0}
+
+    def fetch(self, url):
+        """
+        Returns (source, size, is_temp): source is bytes, or a file path (cached image, or a
+        temp file the caller deletes when is_temp). Returns (None, 0, False) on HTTP errors.
+        Fresh cache entries cost no network; stale ones are revalidated with a conditional GET.
+        """
+        headers = {}
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry:
+            if entry["fresh"]:
+                self.cache.record_hit(url)
+                return entry["path"], entry["size"], False
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        r = self.session.get(url, stream=True, verify=False, headers=headers, timeout=self.timeout)
+        try:
+            if r.status_code == 304 and entry:
+                self.cache.record_hit(url, revalidated=True)
+                return entry["path"], entry["size"], False
+            if r.status_code != 200:
+                print(f"Image download failed ({r.status_code}): {url}")
+                return None, 0, False
+
+            chunks = []
+            size = 0
+            spill = None
+            try:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if spill:
+                        spill.write(chunk)
+                        continue
+                    chunks.append(chunk)
+                    if size > self.spill_threshold:
+                        # Next to the cache so store() is a rename on the same filesystem
+                        spill = tempfile.NamedTemporaryFile(
+                            delete=False, suffix=".img", dir=self.cache.cache_dir if self.cache else None
+                        )
+                        spill.write(b''.join(chunks))
+                        chunks = None
+            except Exception:
+                # Not indexed by the cache, so nothing else would ever remove it
+                if spill:
+                    spill.close()
+                    os.remove(spill.name)
+                raise
+            etag = r.headers.get("ETag")
+            last_modified = r.headers.get("Last-Modified")
+        finally:
+            r.close()
+
+        if spill:
+            spill.close()
+            with self.lock:
+                self.stats["bytes"] += size
+                self.stats["spilled"] += 1
+            if self.cache and size <= self.cache.max_bytes // 4:
+                return self.cache.store(url, spill.name, etag, last_modified), size, False
+            return spill.name, size, True
+
+        with self.lock:
+            self.stats["bytes"] += size
+            self.stats["in_memory"] += 1
+            if not self.cache:
+                # Avoided: write + read of the temp file, and open/write/close/open/close/unlink
+                # plus one read per chunk when uploading it. With a cache the image is written anyway.
+                self.stats["disk_bytes_avoided"] += 2 * size
+                self.stats["syscalls_avoided"] += 6 + (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+        data = b''.join(chunks)
+        if self.cache:
+            self.cache.store(url, data, etag, last_modified)
+        return data, size, False
+
+    def prefetch(self, urls):
+        """
+        Starts downloading all URLs in the background.
+        Returns one Future per URL resolving to fetch()'s (source, size, is_temp).
+        """
+        return [self.executor.submit(self.fetch, url) for url in urls]
+
+    def print_summary(self):
+        if self.cache:
+            self.cache.print_summary()
+        s = self.stats
+        if not s["in_memory"] and not s["spilled"]:
+            return
+        avoided = ""
+        if s["disk_bytes_avoided"]:
+            avoided = (f" Avoided {s['disk_bytes_avoided'] / 1024 / 1024:.1f} MB "
+                       f"of temp-file I/O and ~{s['syscalls_avoided']} syscalls.")
+        print(f"Image relay: {s['in_memory']} in memory, {s['spilled']} spilled to disk, "
+              f"{s['bytes'] / 1024 / 1024:.1f} MB relayed.{avoided}")
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
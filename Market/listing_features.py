@@ -0,0 +1,106 @@
+import re
+
+try:
+    import pandas as pd
+except ImportError: # Batches fall back to a plain loop over the same precompiled patterns
+    pd = None
+
+# Amounts are returned in 만원 (10,000 KRW), the unit of pcnala's deposit / premium fields.
+#   "1억 2,000만원" -> 12000, "1.5억" -> 15000, "1억5천" -> 15000, "2천만원" -> 2000,
+#   "30만원" -> 30, "300,000원" -> 30
+# A 천 after 억 means 천만 ("1억5천"); on its own it needs the 만 ("2천만", not "2천원").
+MONEY = (
+    r'(?:(?P<eok>\d+(?:\.\d+)?)\s*억\s*(?:(?P<cheon>\d+)\s*천\s*)?(?:(?P<man>\d[\d,]*)\s*만|만)?'
+    r'|(?P<cheon_only>\d+(?:\.\d+)?)\s*천\s*(?:(?P<cheon_man>\d[\d,]*)\s*)?만'
+    r'|(?P<man_only>\d[\d,]*(?:\.\d+)?)\s*만'
+    r'|(?P<won>\d[\d,]*)\s*원)'
+)
+
+# A count is never followed by more digits or 년 ("컴퓨터 2023년식" is a model year)
+PC_COUNT = re.compile(r'(?:PC|피씨|컴퓨터)\s*[:：]?\s*(?P<count>\d{1,4})(?![\d.]|\s*년)', re.IGNORECASE)
+SEAT_COUNT = re.compile(r'(?P<count>\d{1,4})\s*(?:석|좌석)')
+MANAGEMENT_FEE = re.compile(r'관리비\s*[:：]?\s*(?:월\s*)?(?:약\s*)?' + MONEY)
+MONTHLY_REVENUE = re.compile(
+    r'(?:월\s*)?(?:평균\s*)?(?:월\s*)?매출(?:액)?\s*[:：]?\s*(?:월\s*)?(?:평균\s*)?(?:약\s*)?' + MONEY
+)
+
+MONEY_GROUPS = ("eok", "cheon", "man", "cheon_only", "cheon_man", "man_only", "won")
+
+def _number(value):
+    return float(value.replace(',', '')) if value else 0.0
+
+def _man(eok, cheon, man, cheon_only, cheon_man, man_only, won):
+    """만원 total of the MONEY groups (works on floats and on pandas Series alike)."""
+    return (eok * 10000 + cheon * 1000 + man + cheon_only * 1000 + cheon_man + man_only
+            + won / 10000)
+
+def parse_money(match):
+    """만원 amount from a MONEY match (int), or 0."""
+    if not match:
+        return 0
+    g = match.groupdict()
+    total = _man(*(_number(g[name]) for name in MONEY_GROUPS))
+    return int(round(total))
+
+def listing_text(data):
+    """The free text a listing's features are extracted from."""
+    real_estate = data.get("realEstate", {})
+    return " ".join(filter(None, (data.get("title"), real_estate.get("facilities"), data.get("description"))))
+
+def extract(text):
+    """Features of one listing: {"pcCount", "managementFee", "averageMonthlyRevenue"} (0 if absent)."""
+    count = PC_COUNT.search(text) or SEAT_COUNT.search(text)
+    return {
+        "pcCount": int(count.group("count")) if count else 0,
+        "managementFee": parse_money(MANAGEMENT_FEE.search(text)),
+        "averageMonthlyRevenue": parse_money(MONTHLY_REVENUE.search(text)),
+    }
+
+def fill(data):
+    """Fills the features of one mapped listing where map_to_api left 0. Returns data."""
+    real_estate = data.setdefault("realEstate", {})
+    for key, value in extract(listing_text(data)).items():
+        if not real_estate.get(key):
+            real_estate[key] = value
+    return data
+
+def _money_column(texts, pattern):
+    """Vectorized parse_money over a pandas Series of texts."""
+    parts = texts.str.extract(pattern).apply(
+        lambda col: pd.to_numeric(col.astype(str).str.replace(',', '', regex=False), errors='coerce')
+    ).fillna(0)
+    total = _man(*(parts[name] for name in MONEY_GROUPS))
+    return total.round().astype(int)
+
+def extract_batch(texts):
+    """
+    Features for many listings at once: {"pcCount": [...], "managementFee": [...], ...}.
+    With pandas every pattern runs as one Series.str.extract over the whole column
+    and the unit math is vectorized; otherwise falls back to extract() per text.
+    """
+    if pd is None:
+        rows = [extract(text) for text in texts]
+        return {key: [row[key] for row in rows] for key in ("pcCount", "managementFee", "averageMonthlyRevenue")}
+
+    texts = pd.Series(list(texts), dtype=object).fillna("")
+    pc = pd.to_numeric(texts.str.extract(PC_COUNT)["count"], errors='coerce')
+    seats = pd.to_numeric(texts.str.extract(SEAT_COUNT)["count"], errors='coerce')
+    return {
+        "pcCount": pc.fillna(seats).fillna(0).astype(int).tolist(),
+        "managementFee": _money_column(texts, MANAGEMENT_FEE).tolist(),
+        "averageMonthlyRevenue": _money_column(texts, MONTHLY_REVENUE).tolist(),
+    }
+
+def fill_batch(listings):
+    """fill() for a list of mapped listings, using extract_batch(). Returns the number of fields filled."""
+    if not listings:
+        return 0
+    features = extract_batch(listing_text(data) for data in listings)
+    filled = 0
+    for key, values in features.items():
+        for data, value in zip(listings, values):
+            real_estate = data.setdefault("realEstate", {})
+            if not real_estate.get(key) and value:
+                real_estate[key] = value
+                filled += 1
+    return filled
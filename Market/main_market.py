@@ -1,12 +1,18 @@
 
 import asyncio
+import argparse
 import re
-import time
 import sys
-from db import init_db, is_posted, save_post
-from telegram_link_collector import fetch_links
+import config
+from common.scheduler import AdaptiveScheduler, run_scheduled
+from common.runtime import RunBudget, InstanceLock
+from common.ratelimit import HostRateLimiter
+from common.dool_client import CircuitOpenError
+from db import init_db, close_db, is_posted, filter_unposted, save_post, add_link, get_due_links, save_scraped, mark_posted, mark_failed
+from telegram_link_collector import iter_links
 from scraper_pcnala import PCNalaScraper
 from web_poster_market import WebPosterMarket
+from resync import resync, listing_hash
 
 def extract_id_from_url(url):
     # url: https://pcnala.com/trade/UUID
@@ -15,23 +21,17 @@ def extract_id_from_url(url):
         return match.group(1)
     return None
 
-async def main():
-    sys.stdout.reconfigure(encoding='utf-8')
-    print("Starting Market Crawler (PCNala -> API)...", flush=True)
-    
-    # 1. Init DB
-    init_db()
-    
-    # 2. Collect Links
-    print("\n[Phase 1] Collecting Links from Telegram...")
-    links = await fetch_links(limit=50)
-    
-    if not links:
-        print("No links found. Exiting.")
-        return
+SCHEDULE_STATE_FILE = "schedule_state.json"
+LOCK_FILE = "crawler.lock"
+
+instance_lock = InstanceLock(LOCK_FILE)
 
-    # 3. Process Links
-    print(f"\n[Phase 2] Processing {len(links)} links...")
+async def run_once(time_budget=None):
+    """
+    One collection + posting cycle. Returns the number of links collected.
+    All phases share one time budget (seconds, None = unlimited).
+    """
+    budget = RunBudget(time_budget)
     
     scraper = PCNalaScraper()
     poster = WebPosterMarket()
@@ -39,48 +39,195 @@ async def main():
     # Verify Poster Login first
     if not poster.login():
         print("API Login failed. clean exit.")
-        return
+        return 0
+
+    # 2. Collect Links / 3. Process Links
+    # Links stream in from Telegram and are scraped while the walk continues
+    print("\n[Phase 1+2] Collecting links from Telegram and processing them as they arrive...")
 
+    # Scrapers and uploaders run concurrently: pcnala requests are paced by a per-host
+    # token bucket (no fixed sleep, skipped links cost nothing), dool uploads are capped
+    # by the number of upload workers. The bounded queue keeps scraping a few listings ahead.
+    # Every link is recorded in the links table first, so whatever this run does not
+    # finish (budget, crash, dool down, failures) is picked up by the next one.
+    limiter = HostRateLimiter(config.PCNALA_RATE_PER_SEC, config.PCNALA_BURST)
+    link_queue = asyncio.Queue()
+    upload_queue = asyncio.Queue(maxsize=config.UPLOAD_CONCURRENCY * 2)
+    stop = asyncio.Event() # Set when dool.co.kr is down
+    found = 0 # New links discovered in Telegram
     new_count = 0
     
-    for link in links:
-        item_id = extract_id_from_url(link)
-        if not item_id:
-            print(f"Skipping invalid URL: {link}")
-            continue
-            
-        if is_posted(item_id):
-            print(f"Skipping already posted: {item_id}")
-            continue
-            
-        print(f"Processing: {link} (ID: {item_id})")
-        
-        # Scrape
-        data = scraper.parse_detail(link)
-        if not data:
-            print("Failed to scrape data, skipping.")
-            continue
+    # Resume: links left unfinished by earlier runs go first
+    due = get_due_links()
+    if due:
+        unposted = set(filter_unposted(row["id"] for row in due)) # One query for the whole backlog
+        mark_posted([row["id"] for row in due if row["id"] not in unposted])
+        due = [row for row in due if row["id"] in unposted]
+        print(f"Resuming {len(due)} unfinished links from earlier runs.")
+    for row in due:
+        link_queue.put_nowait(row)
+    
+    def record_failure(item_id, error):
+        """Marks a link FAILED (retried later) without letting a second error kill the worker."""
+        print(f"Error processing {item_id}: {error}")
+        try:
+            mark_failed(item_id, str(error))
+        except Exception as db_error:
+            print(f"Could not record the failure of {item_id}: {db_error}")
+    
+    async def feed_links():
+        nonlocal found
+        link_stream = iter_links(budget=budget)
+        try:
+            async for link, msg_id in link_stream:
+                if stop.is_set():
+                    break
+                item_id = extract_id_from_url(link)
+                if not item_id:
+                    print(f"Skipping invalid URL: {link}")
+                    continue
+                found += 1
+                if is_posted(item_id):
+                    print(f"Skipping already posted: {item_id}")
+                    continue
+                if add_link(item_id, link, msg_id):
+                    link_queue.put_nowait({"id": item_id, "url": link, "message_id": msg_id, "payload": None})
+        except Exception as e:
+            # Leaving the walk early keeps the Telegram checkpoint, so unrecorded links are seen again next run
+            print(f"Link collection stopped: {e}")
+        finally:
+            await link_stream.aclose()
+            for _ in range(config.SCRAPE_WORKERS):
+                link_queue.put_nowait(None)
+    
+    async def scrape_worker():
+        while True:
+            row = await link_queue.get()
+            if row is None or stop.is_set() or budget.expired():
+                return
+            item_id, link = row["id"], row["url"]
             
-        print(f"Scraped Title: {data.get('title')}")
-        
-        # Post
-        success = poster.post_product(data)
+            try:
+                data = row["payload"]
+                if data:
+                    print(f"Retrying upload of cached listing: {link} (ID: {item_id})")
+                else:
+                    print(f"Processing: {link} (ID: {item_id})")
+                    
+                    # Scrape
+                    await limiter.acquire(link)
+                    data = await scraper.parse_detail_async(link)
+                    if not data:
+                        print("Failed to scrape data, skipping.")
+                        mark_failed(item_id, "scrape failed")
+                        continue
+                    save_scraped(item_id, data)
+                    
+                print(f"Scraped Title: {data.get('title')}")
+                
+                # Images start downloading while the listing waits for an upload slot
+                await upload_queue.put((item_id, data, poster.prefetch_images(data.get('images', []))))
+            except Exception as e:
+                record_failure(item_id, e)
+    
+    async def upload_worker():
+        nonlocal new_count
+        while True:
+            item = await upload_queue.get()
+            if item is None:
+                return
+            item_id, data, prefetched = item
+            if stop.is_set():
+                poster.discard_prefetched(prefetched)
+                continue # Stays SCRAPED for the next run
+                
+            # A dead worker would leave the scrape workers blocked on the full upload queue
+            try:
+                content_hash = listing_hash(data) # Before posting: the poster consumes data['images']
+                try:
+                    success = await poster.post_product_async(data, prefetched=prefetched)
+                except CircuitOpenError as e:
+                    print(f"dool.co.kr looks down ({e}). Stopping this run.")
+                    stop.set()
+                    continue
+                    
+                if success:
+                    remote_id = success if isinstance(success, str) else None # dool product id, for re-sync updates
+                    save_post(item_id, data.get('title', 'Untitled'), remote_id, content_hash)
+                    mark_posted(item_id)
+                    print("Saved to DB.")
+                    new_count += 1
+                else:
+                    print("Failed to post to API.")
+                    mark_failed(item_id, "upload failed")
+            except Exception as e:
+                record_failure(item_id, e)
+    
+    uploaders = [asyncio.create_task(upload_worker()) for _ in range(config.UPLOAD_CONCURRENCY)]
+    try:
+        try:
+            await asyncio.gather(feed_links(), *(scrape_worker() for _ in range(config.SCRAPE_WORKERS)))
+        finally:
+            # Already scraped listings are still uploaded after the budget runs out
+            for _ in uploaders:
+                await upload_queue.put(None)
+            await asyncio.gather(*uploaders)
         
-        if success:
-            save_post(item_id, data.get('title', 'Untitled'))
-            print("Saved to DB.")
-            new_count += 1
-        else:
-            print("Failed to post to API.")
-            
-        # Polite delay
-        time.sleep(3)
+        if budget.expired():
+            print("Time budget exhausted. Unfinished links stay queued for the next run.")
+
+        if not found and not due:
+            print("No links found.")
+        print(f"\nJob Complete. Posted {new_count} new items.")
+        scraper.print_summary()
+    finally:
+        poster.close()
+        scraper.close()
+        await poster.aclose()
+        await scraper.aclose()
+    return found
 
-    print(f"\nJob Complete. Posted {new_count} new items.")
-    poster.close()
+async def main():
+    parser = argparse.ArgumentParser(description="Market Crawler (PCNala -> API)")
+    parser.add_argument('--schedule', action='store_true', help="Keep running and poll at an adaptive interval")
+    parser.add_argument('--resync', action='store_true', help="Re-check posted listings and update the changed ones, then exit")
+    parser.add_argument('--time-budget', type=int, default=None, help="Stop starting new work after N seconds per run (e.g. 3300 for hourly cron)")
+    args = parser.parse_args()
+
+    # Refuse to run alongside another instance (e.g. a slow cron run)
+    if not instance_lock.acquire():
+        print(f"Another crawler instance holds {LOCK_FILE}. Exiting.")
+        return
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    print("Starting Market Crawler (PCNala -> API)...", flush=True)
+    
+    # 1. Init DB
+    init_db()
+    
+    if args.resync:
+        await resync(RunBudget(args.time_budget))
+        return
+    
+    if args.schedule:
+        scheduler = AdaptiveScheduler(
+            SCHEDULE_STATE_FILE,
+            min_interval=config.SCHEDULE_MIN_INTERVAL,
+            max_interval=config.SCHEDULE_MAX_INTERVAL,
+            target_per_poll=config.SCHEDULE_TARGET_PER_POLL,
+            jitter=config.SCHEDULE_JITTER
+        )
+        print("Scheduler mode enabled.")
+        await run_scheduled(config.SOURCE_CHAT, lambda: run_once(time_budget=args.time_budget), scheduler)
+        return
+    
+    await run_once(time_budget=args.time_budget)
 
 if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         print("Stopped by user.")
+    finally:
+        close_db()
+        instance_lock.release()
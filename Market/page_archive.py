@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError: # Falls back to gzip; both codecs can be read back if available
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = "page_archive"
+# Versions kept per trade ID; older ones are pruned when a new one is stored (0 = keep all)
+DEFAULT_KEEP_VERSIONS = 3
+# SQLite's default limit on host parameters per statement (older builds)
+MAX_QUERY_PARAMS = 900
+TRADE_ID = re.compile(r'trade/([a-zA-Z0-9-]+)')
+
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+def compress(data):
+    """Returns (codec, compressed bytes), zstd when available."""
+    if zstandard is not None:
+        return "zst", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "gz", gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def decompress(codec, data):
+    if codec == "zst":
+        if zstandard is None:
+            raise RuntimeError("Archive entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+def read_object(path, codec):
+    """Reads one archived page back as bytes (usable from worker processes)."""
+    with open(path, 'rb') as f:
+        return decompress(codec, f.read())
+
+class PageArchive:
+    """
+    Compressed, content-addressed store of fetched pcnala pages for offline reprocessing.
+    Objects live at objects/<sha256[:2]>/<sha256>.<codec> (identical pages are stored once);
+    an SQLite index maps trade ID -> its archived versions, the newest keep_versions of them.
+    Thread-safe.
+    """
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR, keep_versions=DEFAULT_KEEP_VERSIONS):
+        self.archive_dir = archive_dir
+        self.keep_versions = keep_versions
+        self.lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "pruned": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+        os.makedirs(os.path.join(archive_dir, "objects"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(archive_dir, "index.db"), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                trade_id TEXT,
+                sha256 TEXT,
+                url TEXT,
+                codec TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                PRIMARY KEY (trade_id, sha256)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages(trade_id, fetched_at)')
+        self.conn.commit()
+
+    def _object_path(self, digest, codec):
+        return os.path.join(self.archive_dir, "objects", digest[:2], f"{digest}.{codec}")
+
+    def store(self, url, content):
+        """Archives a fetched page (raw bytes). Returns its sha256, or None if the URL has no trade ID."""
+        match = TRADE_ID.search(url)
+        if not match:
+            return None
+        digest = hashlib.sha256(content).hexdigest()
+
+        with self.lock:
+            row = self.conn.execute('SELECT codec FROM pages WHERE sha256 = ? LIMIT 1', (digest,)).fetchone()
+        # Compressing is the slow part and runs outside the lock; it is wasted only when
+        # another thread stores the same page at the same moment
+        packed = None
+        if not (row and os.path.exists(self._object_path(digest, row[0]))):
+            codec, packed = compress(content)
+
+        # Existence check, write, index insert and pruning in one critical section:
+        # _prune() of another thread must not delete the object in between
+        with self.lock:
+            if packed is None:
+                codec = row[0]
+                if not os.path.exists(self._object_path(digest, codec)): # Pruned since the check above
+                    codec, packed = compress(content)
+            if packed is None:
+                self.stats["deduplicated"] += 1
+            else:
+                path = self._object_path(digest, codec)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(packed)
+                os.replace(tmp, path) # Atomic
+                self.stats["stored"] += 1
+                self.stats["raw_bytes"] += len(content)
+                self.stats["stored_bytes"] += len(packed)
+
+            self.conn.execute('''
+                INSERT OR REPLACE INTO pages (trade_id, sha256, url, codec, size, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (match.group(1), digest, url, codec, len(content), time.time()))
+            self._prune(match.group(1))
+            self.conn.commit()
+        return digest
+
+    def _prune(self, trade_id):
+        """Drops all but the newest keep_versions versions of a trade. Caller holds the lock."""
+        if self.keep_versions <= 0:
+            return
+        old = self.conn.execute('''
+            SELECT sha256, codec FROM pages WHERE trade_id = ?
+            ORDER BY fetched_at DESC LIMIT -1 OFFSET ?
+        ''', (trade_id, self.keep_versions)).fetchall()
+        for digest, codec in old:
+            self.conn.execute('DELETE FROM pages WHERE trade_id = ? AND sha256 = ?', (trade_id, digest))
+            # Content-addressed: the object may still be a version of another trade
+            if self.conn.execute('SELECT 1 FROM pages WHERE sha256 = ? LIMIT 1', (digest,)).fetchone():
+                continue
+            try:
+                os.remove(self._object_path(digest, codec))
+            except OSError:
+                pass
+            self.stats["pruned"] += 1
+
+    def latest(self, trade_ids=None):
+        """
+        Returns [(trade_id, object path, codec)] for the newest archived version of each trade
+        (or only of the given trade IDs).
+        """
+        query = '''
+            SELECT trade_id, sha256, codec, MAX(fetched_at) FROM pages
+            {where} GROUP BY trade_id ORDER BY trade_id
+        '''
+        with self.lock:
+            if trade_ids:
+                trade_ids = list(trade_ids)
+                rows = []
+                for i in range(0, len(trade_ids), MAX_QUERY_PARAMS):
+                    batch = trade_ids[i:i + MAX_QUERY_PARAMS]
+                    rows.extend(self.conn.execute(
+                        query.format(where=f"WHERE trade_id IN ({','.join('?' * len(batch))})"), batch
+                    ).fetchall())
+                rows.sort(key=lambda row: row[0])
+            else:
+                rows = self.conn.execute(query.format(where="")).fetchall()
+        return [(trade_id, self._object_path(digest, codec), codec) for trade_id, digest, codec, _ in rows]
+
+    def print_summary(self):
+        s = self.stats
+        if not s["stored"] and not s["deduplicated"]:
+            return
+        ratio = s["raw_bytes"] / s["stored_bytes"] if s["stored_bytes"] else 0
+        print(f"Page archive: {s['stored']} pages stored ({s['raw_bytes'] / 1024:.0f} KB -> "
+              f"{s['stored_bytes'] / 1024:.0f} KB, {ratio:.1f}x), {s['deduplicated']} unchanged, "
+              f"{s['pruned']} old versions pruned.")
+
+    def close(self):
+        self.conn.close()
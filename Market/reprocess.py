@@ -0,0 +1,87 @@
+"""
+Re-runs parsing and map_to_api over the page archive, with no network at all,
+e.g. after map_to_api learned a new field.
+
+Usage:
+    python reprocess.py                       # newest archived version of every trade
+    python reprocess.py <trade_id> ...        # only these trades
+    python reprocess.py --workers 8 --output reprocessed.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import config
+import flight_parser
+import listing_features
+from page_archive import PageArchive, read_object
+from scraper_pcnala import PCNalaScraper
+
+# Listings per vectorized listing_features.fill_batch call
+FEATURE_BATCH_SIZE = 5000
+
+# One lookup per worker process, so the learned 'trade' path is reused across its pages
+_lookup = None
+
+def reprocess_page(item):
+    """Worker: (trade_id, path, codec) -> (trade_id, mapped data or None, error or None)."""
+    global _lookup
+    if _lookup is None:
+        _lookup = flight_parser.KeyLookup()
+    trade_id, path, codec = item
+    try:
+        html = read_object(path, codec).decode('utf-8', errors='replace')
+        trade = flight_parser.find_record(html, 'trade', _lookup)
+        if not trade:
+            return trade_id, None, "no 'trade' record"
+        # Features are extracted for the whole batch in the parent process
+        return trade_id, PCNalaScraper.map_to_api(trade, features=False), None
+    except Exception as e:
+        return trade_id, None, str(e)
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocess archived pcnala pages (offline)")
+    parser.add_argument('trade_ids', nargs='*', help="Only these trade IDs (default: all)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument('--output', default="reprocessed.jsonl", help="JSON lines output: {id, data}")
+    args = parser.parse_args()
+
+    sys.stdout.reconfigure(encoding='utf-8')
+    archive = PageArchive(config.ARCHIVE_DIR)
+    pages = archive.latest(args.trade_ids)
+    archive.close()
+    if not pages:
+        print(f"No archived pages in {config.ARCHIVE_DIR}.")
+        return
+    print(f"Reprocessing {len(pages)} archived pages with {args.workers} workers...")
+
+    start = time.monotonic()
+    ok = failed = filled = 0
+    batch = [] # (trade_id, data) waiting for feature extraction
+    
+    def flush(out):
+        nonlocal filled
+        filled += listing_features.fill_batch([data for _, data in batch])
+        for trade_id, data in batch:
+            out.write(json.dumps({"id": trade_id, "data": data}, ensure_ascii=False) + "\n")
+        batch.clear()
+    
+    with ProcessPoolExecutor(max_workers=args.workers) as executor, open(args.output, 'w', encoding='utf-8') as out:
+        for trade_id, data, error in executor.map(reprocess_page, pages, chunksize=16):
+            if data is None:
+                print(f"{trade_id}: {error}")
+                failed += 1
+                continue
+            batch.append((trade_id, data))
+            ok += 1
+            if len(batch) >= FEATURE_BATCH_SIZE:
+                flush(out)
+        flush(out)
+
+    elapsed = time.monotonic() - start
+    print(f"Done in {elapsed:.1f}s: {ok} listings written to {args.output} ({filled} feature fields filled), {failed} failed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import json
+import config
+from common.dool_client import CircuitOpenError
+from common.ratelimit import HostRateLimiter
+from db import get_posts_for_resync, record_check
+from scraper_pcnala import PCNalaScraper, NOT_MODIFIED
+from web_poster_market import WebPosterMarket
+
+TRADE_URL = "https://pcnala.com/trade/{}"
+
+def listing_hash(data):
+    """Content hash of a mapped listing: the realEstate payload and the image URLs, in order."""
+    content = {
+        "realEstate": data.get("realEstate", {}),
+        "images": data.get("images", [])
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+async def resync(budget):
+    """
+    Re-checks already posted listings (least recently checked first) and pushes an update
+    for each one whose content hash changed. Pages are re-fetched with conditional GETs,
+    so an unchanged listing usually costs one 304 and no parsing, hashing or upload,
+    but every posted listing still costs one request: run time grows with the number of
+    posted listings, not with the number of changes (hence the time budget).
+    A page whose update failed is dropped from the page cache, so NOT_MODIFIED always
+    means "unchanged since the last successful sync".
+    Returns the number of updated listings.
+    """
+    posts = get_posts_for_resync()
+    print(f"\n[Re-sync] Checking {len(posts)} posted listings...")
+    if not posts:
+        return 0
+
+    scraper = PCNalaScraper()
+    poster = WebPosterMarket()
+    if not poster.login():
+        print("API Login failed. clean exit.")
+        return 0
+
+    limiter = HostRateLimiter(config.PCNALA_RATE_PER_SEC, config.PCNALA_BURST)
+    queue = asyncio.Queue()
+    for post in posts:
+        queue.put_nowait(post)
+    stop = asyncio.Event() # Set when dool.co.kr is down
+    stats = {"checked": 0, "not_modified": 0, "unchanged": 0, "baseline": 0, "updated": 0, "failed": 0}
+
+    async def worker():
+        while not stop.is_set() and not budget.expired():
+            try:
+                post = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            url = TRADE_URL.format(post["id"])
+
+            await limiter.acquire(url)
+            data = await scraper.parse_detail_async(url, changed_only=True)
+            stats["checked"] += 1
+            if data is NOT_MODIFIED:
+                stats["not_modified"] += 1
+                record_check(post["id"])
+                continue
+            if not data:
+                print(f"Could not re-fetch {url}, will retry next re-sync.")
+                stats["failed"] += 1
+                continue
+
+            new_hash = listing_hash(data)
+            if new_hash == post["content_hash"]:
+                stats["unchanged"] += 1
+                record_check(post["id"])
+                continue
+            if not post["content_hash"] or not post["remote_id"]:
+                # Posted before hashes / product ids were stored: nothing to compare against or update
+                stats["baseline"] += 1
+                record_check(post["id"], new_hash)
+                continue
+
+            print(f"Changed: {data.get('title')} ({post['id']}). Updating product {post['remote_id']}...")
+            try:
+                success = await poster.update_product_async(
+                    post["remote_id"], data, prefetched=poster.prefetch_images(data.get('images', []))
+                )
+            except CircuitOpenError as e:
+                print(f"dool.co.kr looks down ({e}). Stopping the re-sync.")
+                # The changed page is already cached: drop it, or the next re-sync sees a 304
+                scraper.page_cache.invalidate(url)
+                stop.set()
+                return
+            if success:
+                stats["updated"] += 1
+                record_check(post["id"], new_hash)
+            else:
+                scraper.page_cache.invalidate(url)
+                stats["failed"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(config.SCRAPE_WORKERS)))
+
+    if budget.expired():
+        print("Time budget exhausted. The rest is checked first next re-sync.")
+    print(f"\nRe-sync complete. {stats['checked']} checked: {stats['not_modified']} not modified (304), "
+          f"{stats['unchanged']} unchanged, {stats['updated']} updated, {stats['baseline']} hashed for the first time, "
+          f"{stats['failed']} failed.")
+    scraper.print_summary()
+    poster.close()
+    scraper.close()
+    await poster.aclose()
+    await scraper.aclose()
+    return stats["updated"]
@@ -1,146 +1,248 @@
-
+import asyncio
+import os
+import threading
 import requests
 import re
 import json
 import logging
+import config
+from common import async_http
+from http_cache import HttpCache
+from page_archive import PageArchive
+import flight_parser
+import listing_features
+
+try:
+    import brotli # noqa: F401  (lets requests/httpx decode Content-Encoding: br)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+PAGE_CACHE_DIR = os.path.join("page_cache", "pcnala")
+
+# parse_detail(changed_only=True) result for a page that has not changed since it was cached
+NOT_MODIFIED = object()
+# _handle_response() result when a 304 arrives for a cache entry evicted since the lookup
+_EVICTED = object()
 
 class PCNalaScraper:
     def __init__(self):
         self.session = requests.Session()
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            "Accept-Encoding": ACCEPT_ENCODING
         }
         # Suppress SSL warnings
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        
+        # Detail pages are kept on disk and re-checked with If-None-Match / If-Modified-Since
+        self.page_cache = HttpCache(
+            PAGE_CACHE_DIR,
+            max_bytes=config.PAGE_CACHE_MAX_BYTES,
+            max_age=config.PAGE_CACHE_MAX_AGE,
+            label="Page cache"
+        )
+        # Every downloaded page is also archived compressed, for reprocess.py
+        self.archive = PageArchive(config.ARCHIVE_DIR, config.ARCHIVE_KEEP_VERSIONS) if config.ARCHIVE_PAGES else None
+        self.lock = threading.Lock() # Guards stats when pages are fetched from threads
+        self.stats = {"fetched": 0, "not_modified": 0, "cached": 0, "wire_bytes": 0, "decoded_bytes": 0}
+        # Remembers where 'trade' sits in the React tree, so most pages skip the full walk
+        self.trade_lookup = flight_parser.KeyLookup()
+        
+        # Optional async transport (httpx, HTTP/2): detail pages share one connection
+        self.async_session = None
+        if config.HTTP_TRANSPORT == "httpx" and async_http.available():
+            self.async_session = async_http.make_client(verify=False, headers=self.headers)
+
+    # --- Fetching ---
+
+    def _validators(self, url):
+        """
+        Returns (cached entry or None, request headers). A fresh entry needs no request at all,
+        a stale one is revalidated with a conditional GET.
+        """
+        entry = self.page_cache.lookup(url)
+        headers = dict(self.headers)
+        if entry and not entry["fresh"]:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return entry, headers
+
+    def _read_cached(self, entry):
+        """The cached HTML, or None if the entry was evicted since lookup()."""
+        try:
+            with open(entry["path"], 'rb') as f:
+                return f.read().decode('utf-8', errors='replace')
+        except FileNotFoundError:
+            return None
+
+    def _handle_response(self, url, entry, status, resp_headers, content, wire_bytes, changed_only=False):
+        """
+        Turns a (possibly 304) response into HTML, updating the cache and transfer stats.
+        With changed_only a 304 returns None instead of the cached HTML.
+        """
+        with self.lock:
+            self.stats["wire_bytes"] += wire_bytes
+            if status == 304 and entry:
+                self.stats["not_modified"] += 1
+            else:
+                self.stats["fetched"] += 1
+                self.stats["decoded_bytes"] += len(content)
+
+        if status == 304 and entry:
+            self.page_cache.record_hit(url, revalidated=True)
+            if changed_only:
+                return None
+            html = self._read_cached(entry)
+            if html is None:
+                print(f"Cached copy of {url} was evicted, fetching it again...")
+                return _EVICTED
+            return html
+
+        etag = resp_headers.get("ETag")
+        last_modified = resp_headers.get("Last-Modified")
+        # Without validators an entry could only be reused while fresh
+        if etag or last_modified or self.page_cache.max_age > 0:
+            self.page_cache.store(url, content, etag, last_modified)
+        if self.archive:
+            self.archive.store(url, content)
+        return content.decode('utf-8', errors='replace') # Force utf-8
+
+    def _cache_hit(self, url, entry):
+        if entry and entry["fresh"]:
+            self.page_cache.record_hit(url)
+            with self.lock:
+                self.stats["cached"] += 1
+            return True
+        return False
+
+    def _get(self, url, headers):
+        """GET over requests: (status, headers, content, wire bytes). Raises on HTTP errors."""
+        print(f"Fetching {url}...")
+        resp = self.session.get(url, headers=headers, verify=False)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        
+        # Bytes actually read from the socket (compressed), not the decoded body
+        try:
+            wire_bytes = resp.raw.tell()
+        except (AttributeError, OSError):
+            wire_bytes = int(resp.headers.get("Content-Length") or len(resp.content))
+        return resp.status_code, resp.headers, resp.content, wire_bytes
+
+    async def _get_async(self, url, headers):
+        """_get over the async (HTTP/2) transport."""
+        print(f"Fetching {url}...")
+        resp = await self.async_session.get(url, headers=headers)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        return resp.status_code, resp.headers, resp.content, resp.num_bytes_downloaded
 
-    def parse_detail(self, url):
+    def fetch_html(self, url, changed_only=False):
+        """
+        GETs a detail page (compressed, conditional when cached). Raises on HTTP errors.
+        changed_only: return None if the cached copy is still current (fresh or 304).
+        If the cached copy disappears (evicted) before it is read, the page is fetched unconditionally.
+        """
+        entry, headers = self._validators(url)
+        if self._cache_hit(url, entry):
+            html = None if changed_only else self._read_cached(entry)
+            if changed_only or html is not None:
+                return html
+            entry, headers = None, dict(self.headers)
+        
+        html = self._handle_response(url, entry, *self._get(url, headers), changed_only)
+        if html is _EVICTED:
+            html = self._handle_response(url, None, *self._get(url, dict(self.headers)), changed_only)
+        return html
+
+    async def fetch_html_async(self, url, changed_only=False):
+        """fetch_html over the async (HTTP/2) transport."""
+        entry, headers = self._validators(url)
+        if self._cache_hit(url, entry):
+            html = None if changed_only else self._read_cached(entry)
+            if changed_only or html is not None:
+                return html
+            entry, headers = None, dict(self.headers)
+        
+        html = self._handle_response(url, entry, *(await self._get_async(url, headers)), changed_only)
+        if html is _EVICTED:
+            html = self._handle_response(url, None, *(await self._get_async(url, dict(self.headers))), changed_only)
+        return html
+
+    def parse_detail(self, url, changed_only=False):
         """
         Fetches the page and extracts the 'trade' object from Next.js serialized data.
         Returns a dict mapped to the API structure.
+        changed_only: return NOT_MODIFIED without parsing if the page has not changed since cached.
         """
         try:
-            print(f"Fetching {url}...")
-            resp = self.session.get(url, headers=self.headers, verify=False)
-            resp.encoding = 'utf-8' # Force utf-8
-            resp.raise_for_status()
-            html = resp.text
-
-            # Regex to find the trade object in the Next.js script stream
-            # Pattern: "trade":{ ... }
-            
-            # The structure is complex: ["...", {"trade": ... }]
-            # Let's try to capture the block starting with \"trade\":
-            # and matching balanced braces is hard with regex.
-            
-            # Better approach: Extract the full script lines and parse the array.
-            
-            # Robust parsing of Next.js hydration chunks
-            # self.__next_f.push([ ... ])
-            # We must find start of push([ and find matching ]) respecting quotes.
-            
-            search_str = 'self.__next_f.push(['
-            start_pos = 0
-            
-            # Accumulate string data by chunk ID (usually 1)
-            # chunks[id] = "concatenated string"
-            chunks = {}
-            
-            while True:
-                idx = html.find(search_str, start_pos)
-                if idx == -1:
-                    break
-                
-                content_start = idx + len(search_str)
-                
-                stack = 1
-                in_quote = False
-                escape = False
-                extract_end = -1
-                
-                for i in range(content_start, len(html)):
-                    char = html[i]
-                    
-                    if escape:
-                        escape = False
-                        continue
-                    if char == '\\':
-                        escape = True
-                        continue
-                        
-                    if char == '"':
-                        in_quote = not in_quote
-                    
-                    if not in_quote:
-                        if char == '[':
-                            stack += 1
-                        elif char == ']':
-                            stack -= 1
-                            if stack == 0:
-                                extract_end = i
-                                break
-                
-                if extract_end != -1:
-                    raw_content = html[content_start:extract_end]
-                    
-                    # Wrap in brackets to make it valid JSON array
-                    json_candidate = f"[{raw_content}]"
-                    
-                    try:
-                        chunk = json.loads(json_candidate)
-                        # chunk is [id, "data", ...]
-                        if isinstance(chunk, list) and len(chunk) >= 2:
-                            chunk_id = chunk[0]
-                            chunk_data = chunk[1]
-                            
-                            if isinstance(chunk_data, str):
-                                if chunk_id not in chunks:
-                                    chunks[chunk_id] = ""
-                                chunks[chunk_id] += chunk_data
-                    except json.JSONDecodeError:
-                        pass
-                
-                start_pos = idx + 1
-
-            # Process accumulated chunks
-            for chunk_id, full_data in chunks.items():
-                lines = full_data.split('\n')
-                for line in lines:
-                    if not line.strip(): continue
-                    
-                    if '"trade":' in line or '\\"trade\\":' in line:
-                        try:
-                            # Strip Next.js format prefix (hex_id:)
-                            json_str = line
-                            if ':' in line[:5]:
-                                parts = line.split(':', 1)
-                                if len(parts) > 1:
-                                    possible_json = parts[1]
-                                    if possible_json.startswith(('[', '{', '"')):
-                                        json_str = possible_json
-                            
-                            data = json.loads(json_str)
-                            
-                            if isinstance(data, dict) or isinstance(data, list):
-                                trade_data = self.find_key(data, 'trade')
-                                if trade_data:
-                                    return self.map_to_api(trade_data)
-                        except json.JSONDecodeError:
-                            pass
-
-            print("Could not find 'trade' data in scripts.")
-            return None
+            html = self.fetch_html(url, changed_only)
+            if html is None:
+                return NOT_MODIFIED
+            return self.parse_html(html)
 
-            print("Could not find 'trade' data in scripts.")
+        except Exception as e:
+            print(f"Error parsing {url}: {e}")
             return None
 
+    async def parse_detail_async(self, url, changed_only=False):
+        """
+        Same as parse_detail, fetched natively from the event loop when HTTP_TRANSPORT=httpx.
+        Parsing is CPU-bound and runs in a thread. Without httpx the whole call runs in a thread.
+        """
+        loop = asyncio.get_running_loop()
+        if not self.async_session:
+            return await loop.run_in_executor(None, self.parse_detail, url, changed_only)
+
+        try:
+            html = await self.fetch_html_async(url, changed_only)
+            if html is None:
+                return NOT_MODIFIED
+            return await loop.run_in_executor(None, self.parse_html, html)
+
         except Exception as e:
             print(f"Error parsing {url}: {e}")
             return None
 
-    def map_to_api(self, raw):
+    def print_summary(self):
+        self.page_cache.print_summary()
+        if self.archive:
+            self.archive.print_summary()
+        lookup = self.trade_lookup.stats
+        if lookup["hits"] or lookup["misses"]:
+            print(f"'trade' lookup: {lookup['hits']} path hits, {lookup['misses']} misses (path relearned), "
+                  f"{lookup['not_found']} rows without it ({self.trade_lookup.hit_rate():.0%} hit rate).")
+        s = self.stats
+        if not s["fetched"] and not s["not_modified"]:
+            return
+        print(f"Pages: {s['fetched']} downloaded, {s['not_modified']} not modified (304), {s['cached']} served from cache. "
+              f"{s['wire_bytes'] / 1024:.0f} KB transferred for {s['decoded_bytes'] / 1024:.0f} KB of HTML.")
+
+    # --- Parsing ---
+
+    def parse_html(self, html):
+        """
+        Extracts the 'trade' object from a detail page's Next.js serialized data.
+        Returns a dict mapped to the API structure, or None.
+        """
+        # Flight rows are decoded only if they mention "trade":, stopping at the first match
+        trade_data = flight_parser.find_record(html, 'trade', self.trade_lookup)
+        if trade_data:
+            return self.map_to_api(trade_data)
+
+        print("Could not find 'trade' data in scripts.")
+        return None
+
+    @staticmethod
+    def map_to_api(raw, features=True):
         """
         Maps raw PCNala data to the structure required by psmo_community Market API.
+        features: fill pcCount / managementFee / averageMonthlyRevenue from the listing text
+        (batch jobs pass False and use listing_features.fill_batch instead).
         """
         # API requires:
         # title, description, price (calc from deposit+rights), category="PC_BUSINESS"
@@ -152,11 +254,11 @@ class PCNalaScraper:
         real_estate = {
             "locationCity": raw.get("region", "") or "",
             "locationDistrict": raw.get("sub_region", "") or "정보없음",
-            "pcCount": 0, # Not explicit in raw fields, might be in facilities
+            "pcCount": 0, # Not explicit in raw fields, extracted from the text below
             "deposit": int(raw.get("deposit") or 0),
             "monthlyRent": int(raw.get("monthly_rent") or 0),
-            "managementFee": 0, # Missing
-            "averageMonthlyRevenue": 0, # Missing
+            "managementFee": 0, # Extracted from the text below
+            "averageMonthlyRevenue": 0, # Extracted from the text below
             "rightsMoney": int(raw.get("premium") or 0),
             "floor": int(raw.get("floor") or 0),
             "areaPyeong": float(raw.get("area_size") or 0),
@@ -168,13 +270,6 @@ class PCNalaScraper:
             "contactNumber": raw.get("contact", ""),
         }
         
-        # Extract PC count from facilities if possible
-        facilities = real_estate["facilities"]
-        if facilities:
-            pc_match = re.search(r'PC\s*(\d+)', facilities, re.IGNORECASE)
-            if pc_match:
-                real_estate["pcCount"] = int(pc_match.group(1))
-
         # Images
         images = []
         raw_images = raw.get("trade_images", [])
@@ -185,26 +280,25 @@ class PCNalaScraper:
                 if img.get("image_url"):
                     images.append(img["image_url"])
 
-        return {
+        data = {
             "title": raw.get("title", ""),
             "description": raw.get("content", ""),
             "realEstate": real_estate,
             "images": images
         }
+        if features:
+            listing_features.fill(data)
+        return data
 
-    def find_key(self, obj, key):
-        if isinstance(obj, dict):
-            if key in obj:
-                return obj[key]
-            for k, v in obj.items():
-                if isinstance(v, (dict, list)):
-                    res = self.find_key(v, key)
-                    if res: return res
-        elif isinstance(obj, list):
-            for item in obj:
-                res = self.find_key(item, key)
-                if res: return res
-        return None
+    def close(self):
+        self.page_cache.close()
+        if self.archive:
+            self.archive.close()
+        self.session.close()
+
+    async def aclose(self):
+        if self.async_session:
+            await self.async_session.aclose()
 
 if __name__ == "__main__":
     # Test with the sample URL
@@ -37,7 +37,14 @@ def save_last_id(last_id):
     with open(LAST_ID_FILE, "w") as f:
         f.write(str(last_id))
 
-async def fetch_links(limit=500):
+async def iter_links(budget=None, limit=None):
+    """
+    Yields (link, message_id) for unique pcnala links in new messages as soon as they are
+    found, so scraping can start while the walk continues. Advances the checkpoint once the
+    walk completes. If the time budget runs out (or the consumer stops) mid-walk the
+    checkpoint is left untouched (Newest -> Oldest order means older messages were not seen yet).
+    limit: max messages to read (None = everything since the checkpoint).
+    """
     print(f"Connecting to Telegram... Target: {SOURCE_CHAT}")
     # Bot login (Automatic)
     await client.start(bot_token=os.getenv("TELEGRAM_BOT_TOKEN"))
@@ -45,8 +52,9 @@ async def fetch_links(limit=500):
     last_id = load_last_id()
     print(f"Fetching messages... (Resume from ID: {last_id})")
     
-    links = []
+    seen = {} # Ordered set: link -> message id
     max_id_found = last_id
+    completed = False
     
     try:
         # Use min_id to fetch only new messages
@@ -57,6 +65,10 @@ async def fetch_links(limit=500):
         # Efficient way: Newest -> Oldest until min_id is reached.
         
         async for message in client.iter_messages(SOURCE_CHAT, limit=limit, min_id=last_id):
+            if budget and budget.expired():
+                print("Time budget exhausted. Stopping link collection.")
+                break
+                
             # Track max ID to update state later
             if message.id > max_id_found:
                 max_id_found = message.id
@@ -85,19 +97,31 @@ async def fetch_links(limit=500):
                     found_in_msg.extend(regex_matches)
                 
                 for link in found_in_msg:
-                    if link not in links:
-                        links.append(link)
+                    if link not in seen:
+                        seen[link] = message.id
                         print(f"Found: {link}") # Print immediately
+                        yield link, message.id
+        else:
+            completed = True
                             
     except Exception as e:
         print(f"Error fetching messages: {e}")
     
-    if max_id_found > last_id:
+    if completed and max_id_found > last_id:
         save_last_id(max_id_found)
         print(f"Updated last processed ID to {max_id_found}")
         
-    print(f"Total unique links found: {len(links)}")
-    return links
+    print(f"Total unique links found: {len(seen)}")
+
+async def fetch_links(limit=None, budget=None, with_ids=False):
+    """
+    Collects all links from iter_links() into a list.
+    with_ids=True returns (link, message_id) tuples instead of plain links.
+    """
+    found = [item async for item in iter_links(budget=budget, limit=limit)]
+    if with_ids:
+        return found
+    return [link for link, _ in found]
 
 if __name__ == "__main__":
     import asyncio
@@ -1,103 +1,97 @@
-
-import requests
-import hmac
-import hashlib
+import asyncio
 import json
-import time
-import os
 import os
 from dotenv import load_dotenv
+import config
+from common import async_http
+from common.async_http import AsyncDoolClient
+from common.dool_client import DoolClient, CircuitOpenError
+from common.image_prep import ImagePreparer, extension_for
+from image_relay import ImageRelay
+from http_cache import HttpCache
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+# Limit images count
+MAX_IMAGES = 20
+IMAGE_CACHE_DIR = os.path.join("image_cache", "listings")
+
 class WebPosterMarket:
     def __init__(self):
         # Allow override of base URL via env or config, default to production
         self.base_url = os.getenv("MARKET_TARGET_URL", "https://dool.co.kr/api") 
-        self.session = requests.Session()
-        self.token = None
-        
-        # Headers (Mimic Browser but keep it clean)
-        self.session.headers.update({
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Referer": "https://dool.co.kr/",
-            "Origin": "https://dool.co.kr",
-            "Accept": "application/json, text/plain, */*"
-        })
-
-    def login(self, user_data=None):
+        # Login, token reuse, timeouts, retries and circuit breaker live in the shared client
+        self.client = DoolClient(
+            self.base_url,
+            os.getenv("TELEGRAM_BOT_TOKEN"),
+            pool_size=config.DOOL_POOL_SIZE,
+            connect_timeout=config.DOOL_CONNECT_TIMEOUT,
+            read_timeout=config.DOOL_READ_TIMEOUT,
+            max_retries=config.DOOL_MAX_RETRIES
+        )
+        self.image_preparer = ImagePreparer(
+            max_dim=config.IMAGE_MAX_DIMENSION, quality=config.IMAGE_JPEG_QUALITY,
+            max_bytes=config.NORMALIZED_CACHE_MAX_BYTES
+        )
+        self.image_cache = HttpCache(
+            IMAGE_CACHE_DIR,
+            max_bytes=config.IMAGE_CACHE_MAX_BYTES,
+            max_age=config.IMAGE_CACHE_MAX_AGE,
+            label="Image cache"
+        )
+        self.image_relay = ImageRelay(spill_threshold=config.IMAGE_RELAY_SPILL_THRESHOLD, cache=self.image_cache)
+
+        # Optional async transport (httpx, HTTP/2) for use from the event loop
+        self.async_client = None
+        if config.HTTP_TRANSPORT == "httpx":
+            if async_http.available():
+                self.async_client = AsyncDoolClient(
+                    self.base_url,
+                    os.getenv("TELEGRAM_BOT_TOKEN"),
+                    pool_size=config.DOOL_POOL_SIZE,
+                    connect_timeout=config.DOOL_CONNECT_TIMEOUT,
+                    read_timeout=config.DOOL_READ_TIMEOUT,
+                    max_retries=config.DOOL_MAX_RETRIES
+                )
+            else:
+                print("Warning: HTTP_TRANSPORT=httpx but httpx is not installed. Using requests.")
+
+    @property
+    def token(self):
+        return self.client.token
+
+    def login(self, user_data=None, force=False):
         """
         Logs in via /api/auth/telegram.
+        Reuses a still-valid token from a previous run unless force=True.
         """
+        return self.client.login(user_data, force=force)
 
-        token = os.getenv("TELEGRAM_BOT_TOKEN")
-        if not token:
-            print("Error: TELEGRAM_BOT_TOKEN missing.")
-            return False
-
-        if not user_data:
-             # Default to a "Crawler Admin" persona
-             # Use a generic ID suitable for crawler operations
-             user_data = {
-                 "id": 123456789, 
-                 "first_name": "Crawler", 
-                 "username": "crawler_bot", 
-                 "photo_url": "",
-                 "auth_date": int(time.time())
-             }
-        else:
-            user_data["auth_date"] = int(time.time())
-
-        # 1. Create Data-Check-String
-        keys = sorted([k for k in user_data.keys() if k != "hash"])
-        data_check_string = "\n".join([f"{k}={user_data[k]}" for k in keys])
-        
-        
-        # 2. Secret Key
-        secret_key = hashlib.sha256(token.encode()).digest()
-        
-        # 3. Hash
-        hash_value = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
-        
-        user_data["hash"] = hash_value
-        
-        print(f"Logging in as {user_data.get('username')}...")
-        try:
-            resp = self.session.post(
-                f"{self.base_url}/auth/telegram",
-                data=user_data 
-            )
-            resp.raise_for_status()
-            
-            data = resp.json()
-            self.token = data['token']['accessToken']
-            
-            # Set Authorization Header
-            self.session.headers.update({
-                "Authorization": f"Bearer {self.token}"
-            })
-            print("Login successful! Token acquired.")
-            return True
-            
-        except Exception as e:
-            print(f"Login failed: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Server Response: {e.response.text}")
-            return False
-
-    def post_product(self, data, dry_run=False):
+    def prefetch_images(self, image_urls):
         """
-        Posts a product to the market.
-        data: dict with 'title', 'description', 'realEstate', 'images' (list of urls or paths)
+        Starts downloading a listing's images in the background (e.g. while the previous
+        listing uploads). Returns a handle for post_product(prefetched=...).
         """
-        if not self.token:
-            if not self.login():
-                return False
+        urls = [u for u in image_urls[:MAX_IMAGES] if u.startswith("http")]
+        return dict(zip(urls, self.image_relay.prefetch(urls)))
 
-        if dry_run:
-            print(f"[API Dry Run] Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
-            return True
+    def discard_prefetched(self, prefetched):
+        """Releases a prefetch_images() handle that will not be posted: spilled temp files are removed."""
+        def remove_temp(future):
+            try:
+                src, _, is_temp = future.result()
+            except Exception:
+                return
+            if is_temp:
+                self._cleanup([], [src])
+        for future in (prefetched or {}).values():
+            future.add_done_callback(remove_temp) # Runs right away if already done
 
+    def _build_multipart(self, data, prefetched, opened_files, temp_files):
+        """
+        Maps the scraped listing to the multipart fields (product JSON + normalized images).
+        Opened file handles and temp files are appended to the given lists for the caller to clean up.
+        """
         # Prepare Payload
         # Extract images from data to handle separately
         image_urls = data.pop('images', [])
@@ -111,85 +105,189 @@ class WebPosterMarket:
             r = data.get('realEstate', {}).get('rightsMoney', 0)
             data['price'] = d + r
 
+        multipart_data = [] 
+        
+        # 1. JSON Data -> 'product' field
+        multipart_data.append(('product', (None, json.dumps(data), 'application/json')))
+        
+        # 2. Images
+        # URLs are relayed in memory (oversized ones spill to a temp file),
+        # downloaded concurrently unless prefetch_images() already started them
+        if prefetched is None:
+            prefetched = self.prefetch_images(image_urls)
+        
+        sources = [] # (path or bytes, size, filename)
+        for i, img_src in enumerate(image_urls[:MAX_IMAGES]):
+            try:
+                if img_src.startswith("http"):
+                    src, size, is_temp = prefetched[img_src].result()
+                    if src is None:
+                        continue
+                    if is_temp:
+                        temp_files.append(src)
+                    filename = os.path.basename(img_src).split('?')[0] or f"image_{i}.jpg"
+                    sources.append((src, size, filename))
+                elif os.path.exists(img_src):
+                    # Local file
+                    sources.append((img_src, os.path.getsize(img_src), os.path.basename(img_src)))
+                    
+            except Exception as e:
+                print(f"Error preparing image {img_src}: {e}")
+        
+        # Normalize in a process pool (downscaled, EXIF stripped, real MIME type)
+        prepared = self.image_preparer.prepare([src for src, _, _ in sources])
+        original_bytes = sum(size for _, size, _ in sources)
+        upload_bytes = 0
+        
+        for i, ((src, mime), (_, _, filename)) in enumerate(zip(prepared, sources)):
+            if isinstance(src, bytes):
+                fp = src
+                upload_bytes += len(src)
+            else:
+                fp = open(src, 'rb')
+                opened_files.append(fp)
+                upload_bytes += os.path.getsize(src)
+            
+            filename = os.path.splitext(filename)[0] + extension_for(mime)
+            # field name 'file' for all images (List<MultipartFile>)
+            multipart_data.append(('file', (filename, fp, mime)))
+            print(f"Attached image {i}: {filename} ({mime})")
+        
+        if sources:
+            print(f"Images: {original_bytes / 1024:.0f} KB -> {upload_bytes / 1024:.0f} KB after normalization")
+
+        return multipart_data
+
+    def _check_response(self, resp):
+        """Returns the product id from the response body, or True if it has none."""
+        if resp.status_code != 200 and resp.status_code != 201:
+            print(f"Failed Status: {resp.status_code}")
+            # print(resp.text)
+            resp.raise_for_status()
+            
+        body = resp.json()
+        print("Post success!", body)
+        if isinstance(body, dict):
+            product = body.get("data") if isinstance(body.get("data"), dict) else body
+            product_id = product.get("id") or product.get("productId")
+            if product_id:
+                return str(product_id)
+        return True
+
+    def _cleanup(self, opened_files, temp_files):
+        # Close files
+        for f in opened_files:
+            f.close()
+        # Clean temp files
+        for p in temp_files:
+            try:
+                os.remove(p)
+            except:
+                pass
+
+    def _send(self, method, path, data, dry_run=False, prefetched=None):
+        if not self.token:
+            if not self.login():
+                self.discard_prefetched(prefetched)
+                return False
+
+        if dry_run:
+            print(f"[API Dry Run] {method} {path} Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
+            self.discard_prefetched(prefetched)
+            return True
+
         # Files handling
-        files_to_upload = []
         opened_files = [] 
         temp_files = [] # For downloaded images
 
         try:
-            multipart_data = [] 
-            
-            # 1. JSON Data -> 'product' field
-            multipart_data.append(('product', (None, json.dumps(data), 'application/json')))
-            
-            # 2. Images
-            # If images are URLs, we need to download them first
-            import tempfile
+            multipart_data = self._build_multipart(data, prefetched, opened_files, temp_files)
+
+            print(f"Sending {method} to {self.base_url}{path} ...")
             
-            # Limit images count
-            MAX_IMAGES = 20
-            for i, img_src in enumerate(image_urls[:MAX_IMAGES]):
-                try:
-                    fp = None
-                    filename = f"image_{i}.jpg"
-                    
-                    if img_src.startswith("http"):
-                        # Download
-                        import urllib3
-                        urllib3.disable_warnings() 
-                        r = requests.get(img_src, stream=True, verify=False)
-                        if r.status_code == 200:
-                            tf = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
-                            tf.write(r.content)
-                            tf.close()
-                            temp_files.append(tf.name)
-                            fp = open(tf.name, 'rb')
-                            filename = os.path.basename(img_src).split('?')[0] or f"image_{i}.jpg"
-                    elif os.path.exists(img_src):
-                        # Local file
-                        fp = open(img_src, 'rb')
-                        filename = os.path.basename(img_src)
-                    
-                    if fp:
-                        opened_files.append(fp)
-                        # field name 'file' for all images (List<MultipartFile>)
-                        multipart_data.append(('file', (filename, fp, "image/jpeg")))
-                        print(f"Attached image {i}: {filename}")
-                        
-                except Exception as e:
-                    print(f"Error preparing image {img_src}: {e}")
-
-            print(f"Sending POST to {self.base_url}/v1/market/products ...")
+            resp = self.client.send_multipart(method, path, multipart_data)
+            return self._check_response(resp)
+
+        except CircuitOpenError:
+            raise # Let the caller stop the run
+        except Exception as e:
+            print(f"Post failed: {e}")
+            if getattr(e, 'response', None) is not None:
+                print(f"Response: {e.response.text}")
+            return False
             
-            resp = self.session.post(
-                f"{self.base_url}/v1/market/products",
-                files=multipart_data
+        finally:
+            self._cleanup(opened_files, temp_files)
+
+    async def _send_async(self, method, path, data, dry_run=False, prefetched=None):
+        loop = asyncio.get_running_loop()
+        if not self.async_client:
+            return await loop.run_in_executor(None, self._send, method, path, data, dry_run, prefetched)
+
+        if not self.async_client.token:
+            if not await self.async_client.login():
+                self.discard_prefetched(prefetched)
+                return False
+
+        if dry_run:
+            print(f"[API Dry Run] {method} {path} Data: {json.dumps(data, indent=2, ensure_ascii=False)}")
+            self.discard_prefetched(prefetched)
+            return True
+
+        opened_files = [] 
+        temp_files = []
+
+        try:
+            # Waiting on prefetched images and normalizing them blocks, so it runs off the event loop
+            multipart_data = await loop.run_in_executor(
+                None, self._build_multipart, data, prefetched, opened_files, temp_files
             )
+
+            print(f"Sending {method} to {self.base_url}{path} (async) ...")
             
-            if resp.status_code != 200 and resp.status_code != 201:
-                print(f"Failed Status: {resp.status_code}")
-                # print(resp.text)
-                resp.raise_for_status()
-                
-            print("Post success!", resp.json())
-            return True
+            resp = await self.async_client.send_multipart(method, path, multipart_data)
+            return self._check_response(resp)
 
+        except CircuitOpenError:
+            raise # Let the caller stop the run
         except Exception as e:
             print(f"Post failed: {e}")
-            if hasattr(e, 'response') and e.response:
+            if getattr(e, 'response', None) is not None:
                 print(f"Response: {e.response.text}")
             return False
             
         finally:
-            # Close files
-            for f in opened_files:
-                f.close()
-            # Clean temp files
-            for p in temp_files:
-                try:
-                    os.remove(p)
-                except:
-                    pass
+            self._cleanup(opened_files, temp_files)
+
+    def post_product(self, data, dry_run=False, prefetched=None):
+        """
+        Posts a product to the market.
+        data: dict with 'title', 'description', 'realEstate', 'images' (list of urls or paths)
+        prefetched: handle from prefetch_images() for the same images
+        Returns the new product's id (True if the response has none), False on failure.
+        """
+        return self._send("POST", "/v1/market/products", data, dry_run, prefetched)
+
+    async def post_product_async(self, data, dry_run=False, prefetched=None):
+        """
+        Same as post_product, sent natively from the event loop over the async (HTTP/2)
+        transport when HTTP_TRANSPORT=httpx. Otherwise runs post_product in a thread.
+        """
+        return await self._send_async("POST", "/v1/market/products", data, dry_run, prefetched)
+
+    def update_product(self, product_id, data, dry_run=False, prefetched=None):
+        """Replaces an already posted product (same payload as post_product)."""
+        return self._send("PUT", f"/v1/market/products/{product_id}", data, dry_run, prefetched)
+
+    async def update_product_async(self, product_id, data, dry_run=False, prefetched=None):
+        return await self._send_async("PUT", f"/v1/market/products/{product_id}", data, dry_run, prefetched)
 
     def close(self):
-        self.session.close()
+        self.image_relay.print_summary()
+        self.image_relay.close()
+        self.image_cache.close()
+        self.client.close()
+
+    async def aclose(self):
+        if self.async_client:
+            await self.async_client.aclose()
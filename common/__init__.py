@@ -0,0 +1,2 @@
+# Modules shared by the BlackList and Market crawlers.
+# Each crawler's config.py puts the project root on sys.path so these import as `common.<module>`.
@@ -0,0 +1,163 @@
+import asyncio
+try:
+    import httpx
+except ImportError: # Async transport is optional; callers fall back to the requests-based clients
+    httpx = None
+from common.dool_client import (
+    BROWSER_HEADERS, DEFAULT_USER, IDEMPOTENT_METHODS, REFUSED_STATUSES, RETRY_STATUSES,
+    CircuitBreaker, CircuitOpenError, retry_delay, sign_login
+)
+from common.multipart import StreamingMultipart
+from common.token_store import TokenStore
+
+def available():
+    return httpx is not None
+
+def make_client(http2=True, pool_size=10, connect_timeout=5, read_timeout=60, verify=True, headers=None):
+    """
+    httpx.AsyncClient for use from the event loop. With HTTP/2 all requests to a host
+    are multiplexed over one connection.
+    """
+    try:
+        import h2 # noqa: F401  (httpx needs it for HTTP/2)
+    except ImportError:
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        verify=verify,
+        headers=headers,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        follow_redirects=True
+    )
+
+class AsyncDoolClient:
+    """
+    Async counterpart of DoolClient on httpx (HTTP/2 when available).
+    Same login/token store, retry policy and circuit breaker semantics.
+    """
+    def __init__(self, base_url, bot_token, token_file="dool_token.json", pool_size=10,
+                 connect_timeout=5, read_timeout=60, max_retries=3, backoff=1.0,
+                 breaker_threshold=5, breaker_reset=120):
+        self.base_url = base_url
+        self.bot_token = bot_token
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.token_store = TokenStore(token_file)
+        self.token = None
+        self.login_user = None
+        self.client = make_client(pool_size=pool_size, connect_timeout=connect_timeout,
+                                  read_timeout=read_timeout, headers=BROWSER_HEADERS)
+
+    def _set_token(self, token):
+        self.token = token
+        self.client.headers["Authorization"] = f"Bearer {self.token}"
+
+    async def login(self, user_data=None, force=False):
+        """See DoolClient.login."""
+        self.login_user = user_data
+        token_key = f"{self.base_url}|{(user_data or DEFAULT_USER)['id']}"
+        if not force:
+            token = self.token_store.load(token_key)
+            if token:
+                self._set_token(token)
+                print("Reusing stored token from a previous run.")
+                return True
+
+        if not self.bot_token:
+            print("Error: TELEGRAM_BOT_TOKEN missing.")
+            return False
+
+        user_data = sign_login(user_data, self.bot_token)
+
+        print(f"Logging in as {user_data.get('username')}...")
+        try:
+            resp = await self.request("POST", "/auth/telegram", data=user_data, auth_retry=False)
+            resp.raise_for_status()
+
+            token = resp.json()['token']
+            self._set_token(token['accessToken'])
+            self.token_store.save(token_key, self.token, token.get('expiresIn'))
+            print("Login successful! Token acquired.")
+            return True
+
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Login failed: {e}")
+            if getattr(e, 'response', None) is not None:
+                print(f"Server Response: {e.response.text}")
+            return False
+
+    async def _sleep_before_retry(self, attempt, resp=None):
+        delay = retry_delay(self.backoff, attempt, resp.headers.get("Retry-After") if resp is not None else None)
+        print(f"[AsyncDoolClient] Retrying in {delay:.1f}s (attempt {attempt + 2}/{self.max_retries + 1})...")
+        await asyncio.sleep(delay)
+
+    async def request(self, method, path, body=None, auth_retry=True, **kwargs):
+        """See DoolClient.request. `body` may be a StreamingMultipart."""
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        if body is not None:
+            kwargs["headers"] = {
+                **kwargs.get("headers", {}),
+                "Content-Type": body.content_type,
+                "Content-Length": str(len(body))
+            }
+
+        attempt = 0
+        while True:
+            self.breaker.check()
+            if body is not None:
+                body.rewind()
+                kwargs["content"] = body.__aiter__()
+
+            try:
+                resp = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.ReadTimeout,
+                    httpx.RemoteProtocolError, httpx.PoolTimeout) as e:
+                # Connect-phase errors never reached the server, safe for any method. A dropped
+                # connection or read timeout may come after a POST was applied: not resent.
+                retryable = method in IDEMPOTENT_METHODS or isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+                )
+                self.breaker.record_failure()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                print(f"[AsyncDoolClient] {method} {path} failed: {e!r}")
+                await self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+
+            if resp.status_code in RETRY_STATUSES:
+                self.breaker.record_failure()
+                retryable = method in IDEMPOTENT_METHODS or resp.status_code in REFUSED_STATUSES
+                if not retryable or attempt >= self.max_retries:
+                    return resp
+                print(f"[AsyncDoolClient] {method} {path} returned {resp.status_code}")
+                await self._sleep_before_retry(attempt, resp)
+                attempt += 1
+                continue
+
+            if resp.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if resp.status_code == 401 and auth_retry:
+                print("Token rejected (401). Logging in again...")
+                auth_retry = False
+                if await self.login(self.login_user, force=True):
+                    continue
+            return resp
+
+    async def send_multipart(self, method, path, fields):
+        """Streams a multipart request over the shared (HTTP/2) connection."""
+        return await self.request(method, path, body=StreamingMultipart(fields))
+
+    async def post_multipart(self, path, fields):
+        return await self.send_multipart("POST", path, fields)
+
+    async def aclose(self):
+        await self.client.aclose()
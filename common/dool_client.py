@@ -0,0 +1,265 @@
+import hashlib
+import hmac
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from common.multipart import StreamingMultipart
+from common.token_store import TokenStore
+
+# Gateway / overload responses: the request did not reach (or was refused by) the app server
+RETRY_STATUSES = {429, 502, 503, 504}
+# For POST only these are retried: with 502/504 the upstream may already have created the record
+REFUSED_STATUSES = {429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Headers (Mimic Browser)
+BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Referer": "https://dool.co.kr/",
+    "Origin": "https://dool.co.kr",
+    "Accept": "application/json, text/plain, */*"
+}
+
+DEFAULT_USER = {
+    "id": 123456789,
+    "first_name": "Crawler",
+    "username": "crawler_bot",
+    "photo_url": ""
+}
+
+def sign_login(user_data, bot_token):
+    """
+    Returns a copy of user_data signed like the Telegram Login Widget does
+    (fresh auth_date + hash), ready to POST to /auth/telegram.
+    """
+    user_data = dict(user_data or DEFAULT_USER)
+    user_data["auth_date"] = int(time.time())
+    user_data.pop("hash", None)
+
+    # 1. Data-Check-String (sorted keys)
+    data_check_string = "\n".join(f"{k}={user_data[k]}" for k in sorted(user_data))
+    # 2. Secret Key = SHA256(bot_token)
+    secret_key = hashlib.sha256(bot_token.encode()).digest()
+    # 3. Hash = HMAC_SHA256(secret_key, data_check_string)
+    user_data["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return user_data
+
+def retry_delay(backoff, attempt, retry_after=None):
+    """Exponential backoff with jitter, never shorter than a numeric Retry-After."""
+    delay = backoff * (2 ** attempt)
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, int(retry_after))
+    return delay * random.uniform(0.5, 1.5)
+
+def is_connect_error(e):
+    """
+    True if the request failed while connecting, i.e. no byte of it reached the server.
+    requests wraps urllib3's NewConnectionError (DNS, refused, connect timeout) a few levels deep.
+    """
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(e, requests.exceptions.ConnectionError):
+        return False
+    seen = set()
+    stack = [e]
+    while stack:
+        err = stack.pop()
+        if err is None or id(err) in seen:
+            continue
+        seen.add(id(err))
+        if isinstance(err, NewConnectionError):
+            return True
+        stack.extend([getattr(err, "reason", None), err.__cause__, err.__context__])
+        stack.extend(arg for arg in getattr(err, "args", ()) if isinstance(arg, BaseException))
+    return False
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while dool.co.kr is considered down."""
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed requests. While open every call fails fast;
+    after `reset_timeout` seconds one trial request is let through (half-open).
+    """
+    def __init__(self, threshold=5, reset_timeout=120):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = None # Half-open: allow a trial request
+                self.failures = self.threshold - 1
+                return
+        raise CircuitOpenError(f"Circuit open after {self.threshold} consecutive failures")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold and self.opened_at is None:
+                self.opened_at = time.monotonic()
+                print(f"[DoolClient] {self.failures} consecutive failures. Circuit opened.")
+
+class DoolClient:
+    """
+    Shared HTTP core for the dool.co.kr API posters:
+    Telegram-widget login with persisted tokens, sized connection pool, explicit
+    connect/read timeouts, retries with exponential backoff + jitter, and a circuit breaker.
+
+    Retries: connection failures and 429/502/503/504 for every method; read timeouts only
+    for idempotent methods (a timed-out POST may already have been applied).
+    """
+    def __init__(self, base_url, bot_token, token_file="dool_token.json", pool_size=10,
+                 connect_timeout=5, read_timeout=60, max_retries=3, backoff=1.0,
+                 breaker_threshold=5, breaker_reset=120):
+        self.base_url = base_url
+        self.bot_token = bot_token
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.token_store = TokenStore(token_file)
+        self.token = None
+        self.login_user = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.session.headers.update(BROWSER_HEADERS)
+
+    # --- Auth ---
+
+    def _set_token(self, token):
+        self.token = token
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.token}"
+        })
+
+    def login(self, user_data=None, force=False):
+        """
+        Logs in via /api/auth/telegram, signing user_data with the bot token like the
+        Telegram Login Widget does. Reuses a still-valid token from a previous run unless force=True.
+        """
+        self.login_user = user_data # Reused for re-login on 401
+        token_key = f"{self.base_url}|{(user_data or DEFAULT_USER)['id']}"
+        if not force:
+            token = self.token_store.load(token_key)
+            if token:
+                self._set_token(token)
+                print("Reusing stored token from a previous run.")
+                return True
+
+        if not self.bot_token:
+            print("Error: TELEGRAM_BOT_TOKEN missing.")
+            return False
+
+        user_data = sign_login(user_data, self.bot_token)
+
+        print(f"Logging in as {user_data.get('username')}...")
+        try:
+            resp = self.request("POST", "/auth/telegram", data=user_data, auth_retry=False)
+            resp.raise_for_status()
+
+            token = resp.json()['token']
+            self._set_token(token['accessToken'])
+            self.token_store.save(token_key, self.token, token.get('expiresIn'))
+            print("Login successful! Token acquired.")
+            return True
+
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Login failed: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Server Response: {e.response.text}")
+            return False
+
+    # --- Requests ---
+
+    def _sleep_before_retry(self, attempt, resp=None):
+        delay = retry_delay(self.backoff, attempt, resp.headers.get("Retry-After") if resp is not None else None)
+        print(f"[DoolClient] Retrying in {delay:.1f}s (attempt {attempt + 2}/{self.max_retries + 1})...")
+        time.sleep(delay)
+
+    def request(self, method, path, body=None, auth_retry=True, **kwargs):
+        """
+        Sends a request to base_url + path with retries. `body` may be a StreamingMultipart,
+        which is rewound before every resend. On 401 logs in again once (auth_retry).
+        Raises CircuitOpenError when the breaker is open.
+        """
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        kwargs.setdefault("timeout", self.timeout)
+        if body is not None:
+            kwargs["data"] = body
+            kwargs["headers"] = {**kwargs.get("headers", {}), "Content-Type": body.content_type}
+
+        attempt = 0
+        while True:
+            self.breaker.check()
+            if body is not None:
+                body.rewind()
+
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # A POST is only resent if it never reached the server; "Connection aborted"
+                # after the body was sent may already have created the record
+                retryable = method in IDEMPOTENT_METHODS or is_connect_error(e)
+                self.breaker.record_failure()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                print(f"[DoolClient] {method} {path} failed: {e}")
+                self._sleep_before_retry(attempt)
+                attempt += 1
+                continue
+
+            if resp.status_code in RETRY_STATUSES:
+                self.breaker.record_failure()
+                retryable = method in IDEMPOTENT_METHODS or resp.status_code in REFUSED_STATUSES
+                if not retryable or attempt >= self.max_retries:
+                    return resp
+                print(f"[DoolClient] {method} {path} returned {resp.status_code}")
+                self._sleep_before_retry(attempt, resp)
+                attempt += 1
+                continue
+
+            if resp.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if resp.status_code == 401 and auth_retry:
+                print("Token rejected (401). Logging in again...")
+                auth_retry = False
+                if self.login(self.login_user, force=True):
+                    continue
+            return resp
+
+    def send_multipart(self, method, path, fields):
+        """
+        Streams a multipart request (fields as for requests' files=).
+        File parts are read in chunks while sending, Content-Length is set up front.
+        """
+        return self.request(method, path, body=StreamingMultipart(fields))
+
+    def post_multipart(self, path, fields):
+        return self.send_multipart("POST", path, fields)
+
+    def close(self):
+        self.session.close()
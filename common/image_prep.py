@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError: # Pillow missing: images are uploaded as-is with a sniffed MIME type
+    Image = None
+
+DEFAULT_CACHE_DIR = os.path.join("image_cache", "normalized")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Entries touched this recently may be in the middle of an upload and are never evicted
+EVICT_GRACE = 60
+CHUNK_SIZE = 64 * 1024
+
+_pool = None
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2)
+    return _pool
+
+def sniff_mime(data):
+    """Detects the real image format from magic bytes (extensions lie)."""
+    if data.startswith(b'\xff\xd8\xff'):
+        return "image/jpeg"
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return "image/png"
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return "image/gif"
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "image/webp"
+    return "application/octet-stream"
+
+def extension_for(mime):
+    return {"image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}.get(mime, ".jpg")
+
+def _read(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, 'rb') as f:
+        return f.read()
+
+def _head(source, size=16):
+    """First bytes of a source, enough for sniff_mime."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source[:size])
+    with open(source, 'rb') as f:
+        return f.read(size)
+
+def _normalize(source, dst_base, max_dim, quality):
+    """
+    Runs in a worker process: downscale, apply EXIF orientation, re-encode without
+    metadata (EXIF/GPS) and write next to dst_base. Returns (path, mime).
+    """
+    data = _read(source)
+    img = Image.open(io.BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_dim, max_dim))
+
+    out = io.BytesIO()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        # Keep transparency
+        img.save(out, format="PNG", optimize=True)
+        path, mime = dst_base + ".png", "image/png"
+    else:
+        img.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        path, mime = dst_base + ".jpg", "image/jpeg"
+
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(out.getvalue())
+    os.replace(tmp, path) # Atomic, so concurrent runs never see half-written files
+    return path, mime
+
+class ImagePreparer:
+    """
+    Normalizes images before upload in a process pool: downscale to max_dim,
+    re-encode at `quality`, strip EXIF/GPS and detect the real format.
+    Results are cached on disk by source hash, so the same image is only encoded once.
+    The cache is capped at max_bytes; least recently used files (by mtime) are evicted.
+    """
+    def __init__(self, max_dim=1600, quality=82, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_dim = max_dim
+        self.quality = quality
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_base(self, source):
+        # Hash in chunks so large files are never held in memory here
+        hasher = hashlib.sha256()
+        if isinstance(source, (bytes, bytearray)):
+            hasher.update(source)
+        else:
+            with open(source, 'rb') as f:
+                for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(block)
+        return os.path.join(self.cache_dir, f"{hasher.hexdigest()}_{self.max_dim}_{self.quality}")
+
+    def _cached(self, base):
+        for ext, mime in ((".jpg", "image/jpeg"), (".png", "image/png")):
+            path = base + ext
+            try:
+                os.utime(path) # mtime doubles as last access for eviction
+            except OSError:
+                continue
+            return path, mime
+        return None
+
+    def _evict(self):
+        """Removes least recently used files until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                if entry.is_file():
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        if total <= self.max_bytes:
+            return
+
+        cutoff = time.time() - EVICT_GRACE
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes or mtime >= cutoff:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def _submit(self, sources):
+        """Returns one entry per source: a finished (path, mime) result or a pending future."""
+        pending = []
+        for source in sources:
+            base = self._cache_base(source)
+            cached = self._cached(base)
+
+            if cached:
+                pending.append(cached)
+            elif Image is None:
+                pending.append((source, sniff_mime(_head(source))))
+            else:
+                # Paths are sent to workers as-is; only in-memory sources are pickled
+                pending.append(_get_pool().submit(_normalize, source, base, self.max_dim, self.quality))
+        return pending
+
+    def _result(self, source, entry):
+        if isinstance(entry, tuple):
+            return entry
+        try:
+            return entry.result()
+        except Exception as e:
+            # Not decodable by Pillow: upload the original
+            print(f"Image normalization failed ({e}). Using original.")
+            return source, sniff_mime(_head(source))
+
+    def prepare(self, sources):
+        """
+        sources: list of file paths or bytes.
+        Returns a list of (path_or_bytes, mime) in the same order.
+        """
+        pending = self._submit(sources)
+        results = [self._result(src, entry) for src, entry in zip(sources, pending)]
+        self._evict()
+        return results
+
+    async def prepare_async(self, sources):
+        """Same as prepare() without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.prepare, sources)
@@ -0,0 +1,110 @@
+import os
+import uuid
+
+CHUNK_SIZE = 64 * 1024
+
+def _quote(value):
+    # HTML5-style escaping, as browsers (and urllib3 2.x) do for form-data names
+    return value.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+
+def _file_length(f):
+    """Bytes left to read in a file object, without reading it."""
+    try:
+        return os.fstat(f.fileno()).st_size - f.tell()
+    except (AttributeError, OSError, ValueError):
+        pos = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        f.seek(pos)
+        return end - pos
+
+class StreamingMultipart:
+    """
+    multipart/form-data body that reads file parts lazily in chunks.
+    Takes the same field list as requests' `files=` ([(name, (filename, value, content_type))]);
+    value may be str, bytes or an open binary file. The total length is known up front,
+    so requests sends a Content-Length header and streams the body instead of rendering
+    it in memory.
+
+    Usage:
+        body = StreamingMultipart(fields)
+        session.post(url, data=body, headers={"Content-Type": body.content_type})
+    """
+    def __init__(self, fields, boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        # Each segment is bytes or (file object, length)
+        self._segments = []
+        self._file_starts = [] # (file object, start offset) for rewind()
+        for name, (filename, value, content_type) in fields:
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"'
+            if filename:
+                header += f'; filename="{_quote(filename)}"'
+            header += '\r\n'
+            if content_type:
+                header += f'Content-Type: {content_type}\r\n'
+            header += '\r\n'
+            self._segments.append(header.encode('utf-8'))
+
+            if isinstance(value, str):
+                self._segments.append(value.encode('utf-8'))
+            elif isinstance(value, (bytes, bytearray)):
+                self._segments.append(bytes(value))
+            else:
+                self._segments.append((value, _file_length(value)))
+                self._file_starts.append((value, value.tell()))
+            self._segments.append(b'\r\n')
+        self._segments.append(f'--{self.boundary}--\r\n'.encode('utf-8'))
+
+        self.len = sum(s[1] if isinstance(s, tuple) else len(s) for s in self._segments)
+        self._index = 0 # Current segment
+        self._offset = 0 # Bytes consumed from the current segment
+
+    def __len__(self):
+        return self.len
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.len
+
+        out = []
+        while size > 0 and self._index < len(self._segments):
+            segment = self._segments[self._index]
+
+            if isinstance(segment, tuple):
+                f, length = segment
+                data = f.read(min(size, length - self._offset))
+            else:
+                data = segment[self._offset:self._offset + size]
+                length = len(segment)
+
+            self._offset += len(data)
+            size -= len(data)
+            out.append(data)
+
+            if self._offset >= length or not data:
+                self._index += 1
+                self._offset = 0
+
+        return b''.join(out)
+
+    def rewind(self):
+        """Resets the body so it can be sent again (e.g. retry after re-login)."""
+        for f, start in self._file_starts:
+            f.seek(start)
+        self._index = 0
+        self._offset = 0
+
+    async def __aiter__(self):
+        # httpx.AsyncClient only streams async iterables
+        for chunk in self:
+            yield chunk
+
+    def __iter__(self):
+        # requests only streams bodies that are iterable
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
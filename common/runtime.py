@@ -0,0 +1,66 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+
+class RunBudget:
+    """
+    Wall-clock budget for one run (--time-budget).
+    Phases call expired() before starting a new item and stop cleanly once it is spent.
+    A budget of None/0 never expires.
+    """
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    def remaining(self):
+        if not self.seconds:
+            return float('inf')
+        return self.seconds - (time.monotonic() - self.started)
+
+    def expired(self):
+        return self.remaining() <= 0
+
+class InstanceLock:
+    """
+    Non-blocking exclusive lock on a file so only one instance of a crawler runs at a time.
+    The OS releases it automatically if the process dies.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def acquire(self):
+        """Returns False immediately if another process holds the lock."""
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(self.fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            os.close(self.fd)
+            self.fd = None
+            return False
+        
+        # Record owner PID for debugging
+        os.ftruncate(self.fd, 0)
+        os.write(self.fd, str(os.getpid()).encode())
+        return True
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self.fd)
+            self.fd = None
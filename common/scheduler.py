@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import random
+import time
+
+class AdaptiveScheduler:
+    """
+    Picks the delay until the next poll of a source from its recent message rate.
+    Busy sources are polled more often, quiet ones less, always within
+    [min_interval, max_interval] and with +/- jitter so runs do not line up.
+    State is kept in a JSON file so the learned rate survives restarts.
+    """
+    def __init__(self, state_file, min_interval=300, max_interval=3 * 3600,
+                 target_per_poll=5, jitter=0.2, smoothing=0.3):
+        self.state_file = state_file
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_per_poll = target_per_poll # Messages we'd like to pick up per poll
+        self.jitter = jitter
+        self.smoothing = smoothing # EWMA weight of the newest observation
+        self.state = self._load()
+
+    def _load(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save(self):
+        with open(self.state_file, "w") as f:
+            json.dump(self.state, f)
+
+    def record(self, source, new_count, now=None):
+        """Records the number of new messages found by a poll that finished at `now`."""
+        now = now or time.time()
+        entry = self.state.get(source, {})
+        last_poll = entry.get("last_poll")
+        
+        if last_poll and now > last_poll:
+            observed = new_count / (now - last_poll) # messages per second
+            rate = entry.get("rate")
+            if rate is None:
+                rate = observed
+            else:
+                rate = self.smoothing * observed + (1 - self.smoothing) * rate
+            entry["rate"] = rate
+            
+        entry["last_poll"] = now
+        entry["last_count"] = new_count
+        self.state[source] = entry
+        self._save()
+
+    def next_delay(self, source):
+        """Seconds to wait before polling `source` again."""
+        rate = self.state.get(source, {}).get("rate")
+        
+        if rate is None:
+            # No history yet: start in the middle of the range
+            delay = (self.min_interval + self.max_interval) / 2
+        elif rate <= 0:
+            delay = self.max_interval
+        else:
+            delay = self.target_per_poll / rate
+            
+        # Clamped after the jitter, so the range holds even at the bounds
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(max(delay, self.min_interval), self.max_interval)
+
+async def run_scheduled(source, job, scheduler):
+    """
+    Runs `job` (async, returns the number of new messages) forever,
+    sleeping an adaptive delay between runs.
+    """
+    while True:
+        try:
+            new_count = await job()
+        except Exception as e:
+            # Not recorded: an outage is not a quiet channel. The next successful poll
+            # measures the messages since the last good one.
+            print(f"[Scheduler] Run failed for {source}: {e}")
+            delay = scheduler.next_delay(source)
+            print(f"[Scheduler] {source}: run failed. Next poll in {delay / 60:.1f} min.", flush=True)
+        else:
+            scheduler.record(source, new_count)
+            delay = scheduler.next_delay(source)
+            print(f"[Scheduler] {source}: {new_count} new. Next poll in {delay / 60:.1f} min.", flush=True)
+        await asyncio.sleep(delay)
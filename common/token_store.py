@@ -0,0 +1,70 @@
+import base64
+import json
+import os
+import time
+
+# Refresh a little before the real expiry so a token never dies mid-request
+EXPIRY_MARGIN = 60
+# Used when neither the login response nor the token itself carries an expiry
+DEFAULT_TTL = 3600
+
+def jwt_expiry(token):
+    """Returns the `exp` claim of a JWT, or None if the token is not a readable JWT."""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+class TokenStore:
+    """
+    Persists dool API access tokens with their expiry in a local JSON file,
+    so a cron run can reuse the previous run's token instead of logging in again.
+    Tokens are stored per key (e.g. base URL + user id).
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _write(self, tokens):
+        tmp = self.path + ".tmp"
+        # Owner-only: the file holds a bearer token
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(tokens, f)
+        os.replace(tmp, self.path)
+
+    def load(self, key):
+        """Returns a stored token that is still valid, or None."""
+        entry = self._read().get(key)
+        if entry and entry.get("expires_at", 0) - EXPIRY_MARGIN > time.time():
+            return entry["token"]
+        return None
+
+    def save(self, key, token, expires_in=None):
+        """
+        expires_in: lifetime in seconds from the login response, if the server sent one.
+        Otherwise the JWT `exp` claim is used, then DEFAULT_TTL.
+        """
+        if expires_in:
+            expires_at = time.time() + int(expires_in)
+        else:
+            expires_at = jwt_expiry(token) or time.time() + DEFAULT_TTL
+            
+        tokens = self._read()
+        tokens[key] = {"token": token, "expires_at": expires_at}
+        self._write(tokens)
+
+    def clear(self, key):
+        tokens = self._read()
+        if tokens.pop(key, None) is not None:
+            self._write(tokens)